@@ -0,0 +1,531 @@
+# Source File Name: CoinCollector_benchmark.py
+# Author's Name: Coin Collector contributors
+# Last Modified By: Coin Collector contributors
+# Date Last Modified: October 18, 2026
+"""
+  Program Description:  Micro-benchmarks for CoinCollector_v4.py. The game runs headless (no window or sound card),
+  so this can be run on any machine with:  python CoinCollector_benchmark.py [--cold]
+
+    - Collision: time spent per frame on the collide_mask checks made by game(), with masks built
+      on every call (before) and with the cached sprite masks (after)
+    - Broad phase: the same checks made through CollisionChecker while the sprites move as they do
+      in-game, with the number of pairs the rect test ruled out before any mask check
+    - Road: time per frame to draw the scrolling road by blitting the whole converted background (before) and the
+      background cropped to the part that scrolls onto the screen (after), and the memory each way holds
+    - Obstacles: time per tick to remember, move and reset 10, 100, 300 and 1000 obstacles kept as one sprite
+      object each (before), kept in the standard library arrays of an obstacle field, and kept in the NumPy
+      arrays of a vectorized obstacle field (after, if NumPy is installed)
+    - Startup: time from starting the game to its first frame, decoding the images and sounds one at a time
+      (the default) and on a pool of STARTUP_THREADS loader threads, from a warm start, and with --cold also from a
+      cold start (with the operating system's file cache emptied first, where that is allowed; this empties the
+      cache of the whole machine, so it is never done unless asked for)
+    - Asset archive: the same startup times again with the assets read from the memory-mapped asset archive rather
+      than the loose files, if the archive has been built (python CoinCollector_packAssets.py)
+    - Surface cache: time to load every in-game image and the road's image by decoding and converting each one
+      (before) and by copying the already converted pixels from the surface cache (after)
+    - Training environments: steps per second of the real game as a step/reset environment, and of the vectorized
+      environment playing VECTOR_ENV_COUNT games at once (if NumPy is installed)
+    - Pixel observations: time per frame to draw a game frame and hand it out as a NumPy array by copying it through
+      pygame.image.tostring (before) and as a view of the frame's pixels (after), and shrunk and grey (if NumPy is
+      installed)
+    - Dense traffic: time per tick to check 10, 100, 300 and 1000 enemy cars against the player and each other,
+      testing every car and every pair (before) and through the enemy field's lane index (after)
+
+"""
+
+import os
+os.environ["COINCOLLECTOR_HEADLESS"] = "1"#no window or sound; must be set before the game is imported
+
+import subprocess, sys, timeit
+import pygame
+import CoinCollector_v4 as game
+
+BENCHMARK_FRAMES = 2000 #the number of frames each benchmark simulates
+BENCHMARK_SEED = 1 #random seed, so every run places the sprites the same way
+OBSTACLE_COUNTS = [10, 100, 300, 1000] #the numbers of obstacles the obstacle benchmark is run with
+OBSTACLE_TICKS = 200 #the number of ticks the obstacle benchmark simulates for each count
+TRAFFIC_TICKS = 10 #the number of ticks the dense traffic benchmark checks for each count
+STARTUP_RUNS = 5 #the number of warm starts timed for each way of loading
+STARTUP_THREADS = 4 #the loader threads startup is also timed with
+ENV_STEPS = 1000 #the number of steps each training environment is timed for
+
+"""
+The SpriteEnemy class is an enemy car kept as a sprite object of its own, as the game did before the obstacle
+fields. It is kept here so the two can be compared.
+"""
+class SpriteEnemy(pygame.sprite.Sprite):
+    def __init__(self):
+        pygame.sprite.Sprite.__init__(self)
+        self.image = game.imageCache.get("enemyCar1.gif")
+        self.mask = game.imageCache.getMask("enemyCar1.gif")
+        self.rect = self.image.get_rect()
+        self.reset()
+
+    def update(self):
+        self.rect.centerx = self.rect.centerx - self.dx
+        if self.rect.centerx < -50:
+            self.reset()
+
+    def reset(self):
+        lane = game.rng.randrange(1, 5)
+        image = game.rng.randrange(1, 3)
+        self.dx = game.rng.randrange(13, 15)
+        self.rect.centerx = 750
+        self.rect.centery = game.LANES[lane - 1]
+        if(lane == 1 or lane == 2):
+            self.dx += game.SCROLL_SPEED
+            imageName = game.ONCOMING_ENEMY_IMAGES[image - 1]
+        else:
+            imageName = game.WITH_ENEMY_IMAGES[image - 1]
+        self.image = game.imageCache.get(imageName)
+        self.mask = game.imageCache.getMask(imageName)
+
+"""
+The SpriteFlotsam class is a piece of flotsam kept as a sprite object of its own, as the game did before the
+obstacle fields
+"""
+class SpriteFlotsam(pygame.sprite.Sprite):
+    def __init__(self):
+        pygame.sprite.Sprite.__init__(self)
+        self.randomImage()
+        self.rect = self.image.get_rect()
+        self.dx = game.SCROLL_SPEED
+        self.reset()
+
+    def update(self):
+        self.rect.centerx -= self.dx
+        if self.rect.centerx < game.RESET_POINT:
+            self.reset()
+
+    def reset(self):
+        self.rect.centerx = game.rng.randrange(game.ENVIRONMENT_START_X, game.ENVIRONMENT_END_X)
+        self.rect.centery = game.rng.randrange(75, game.screen.get_height() - 75)
+        self.randomImage()
+
+    def randomImage(self):
+        imageName = game.FLOTSAM_IMAGES[game.rng.randrange(0, len(game.FLOTSAM_IMAGES))]
+        self.image = game.imageCache.get(imageName)
+        self.mask = game.imageCache.getMask(imageName)
+
+"""
+Create the sprites that game() checks collisions between, without starting any sounds
+"""
+def createCollisionScene():
+    game.imageCache.preload(game.SPRITE_IMAGES)
+    player = game.Player()
+    game.audio.stop("engine")
+    player.rect.center = (60, game.LANE_3)
+    enemies = [SpriteEnemy(), SpriteEnemy()]
+    flotsam = [SpriteFlotsam() for i in range(3)]
+    coin = game.Environment(game.ENVIRONMENT_START_X, game.ENVIRONMENT_END_X, "coin.gif")
+    repair = game.Environment(game.REPAIR_START_X, game.REPAIR_END_X, "fix.gif")
+    star = game.Environment(game.STAR_START_X, game.STAR_END_X, "star.gif")
+    return player, enemies, flotsam + [coin, repair, star]
+
+"""
+Time the collision checks game() makes each frame. If useMasks is False the sprites' cached masks are
+removed, so collide_mask has to build both masks on every call as it did before the masks were cached.
+Returns the average time per frame in milliseconds.
+"""
+def benchmarkCollisions(useMasks, frames = BENCHMARK_FRAMES):
+    game.rng.seed(BENCHMARK_SEED)
+    player, enemies, environment = createCollisionScene()
+    obstacles = enemies + environment
+
+    if not useMasks:
+        for sprite in [player] + obstacles:
+            if hasattr(sprite, "mask"):
+                del sprite.mask
+
+    #place every obstacle on screen so each check does real work, as it would for obstacles near the player
+    for sprite in obstacles:
+        sprite.rect.centerx = game.rng.randrange(0, 640)
+
+    def frame():
+        for sprite in obstacles:
+            pygame.sprite.collide_mask(player, sprite)
+        pygame.sprite.collide_mask(enemies[0], enemies[1])
+
+    seconds = timeit.timeit(frame, number = frames)
+    return seconds * 1000.0 / frames
+
+"""
+Time the collision checks while the sprites move and reset as they do in-game, first going straight to the
+mask check and then through the CollisionChecker's broad phase. Returns the two average times per frame in
+milliseconds, along with the checker so its counters can be reported.
+"""
+def benchmarkBroadPhase(frames = BENCHMARK_FRAMES):
+    game.rng.seed(BENCHMARK_SEED)
+    player, enemies, environment = createCollisionScene()
+    obstacles = enemies + environment
+    
+    #record the obstacle positions for every frame first, so both versions check exactly the same scenes
+    scenes = []
+    for i in range(frames):
+        for sprite in obstacles:
+            sprite.update()
+        scenes.append([sprite.rect.copy() for sprite in obstacles])
+    
+    def run(collide):
+        start = timeit.default_timer()
+        for rects in scenes:
+            for sprite, rect in zip(obstacles, rects):
+                sprite.rect = rect
+            for sprite in obstacles:
+                collide(player, sprite)
+            collide(enemies[0], enemies[1])
+        return (timeit.default_timer() - start) * 1000.0 / frames
+    
+    checker = game.CollisionChecker()
+    maskOnly = run(pygame.sprite.collide_mask)
+    twoPhase = run(checker.collide)
+    return maskOnly, twoPhase, checker
+
+"""
+Return the number of bytes of pixel data held by the given surfaces
+"""
+def surfaceBytes(surfaces):
+    total = 0
+    for surface in surfaces:
+        total += surface.get_pitch() * surface.get_height()
+    return total
+
+"""
+Time drawing the road for a full scroll cycle, first by blitting the whole background image at the road's
+position as the game used to, then by drawing the road's cropped image. Returns the two average times per frame
+in milliseconds, and the bytes held by the whole background and by the crop.
+"""
+def benchmarkRoad(frames = BENCHMARK_FRAMES):
+    road = game.Road()
+    background = pygame.image.load("background.png").convert()#the same pixel format as the road's image
+    surface = game.screen.copy()
+    
+    positions = []
+    for i in range(frames):
+        road.update()
+        positions.append(road.rect.copy())
+    
+    start = timeit.default_timer()
+    for rect in positions:
+        surface.blit(background, rect)
+    wholeImage = (timeit.default_timer() - start) * 1000.0 / frames
+    
+    start = timeit.default_timer()
+    for rect in positions:
+        road.rect = rect
+        road.draw(surface)
+    cropped = (timeit.default_timer() - start) * 1000.0 / frames
+    
+    return wholeImage, cropped, surfaceBytes([background]), surfaceBytes([road.image])
+
+"""
+Time one tick of obstacle movement for the given number of obstacles (half enemy cars, half flotsam): remembering
+where each one was, moving it, and resetting those that left the screen. This is done first with a sprite object per
+obstacle, then with an obstacle field for each kind, and then with vectorized obstacle fields. Returns the three
+average times per tick in milliseconds; the last is None if NumPy is not installed.
+"""
+def benchmarkObstacles(count, ticks = OBSTACLE_TICKS):
+    game.imageCache.preload(game.SPRITE_IMAGES)
+    enemyCount = count // 2
+    
+    game.rng.seed(BENCHMARK_SEED)
+    sprites = pygame.sprite.OrderedUpdates([SpriteEnemy() for i in range(enemyCount)] + [SpriteFlotsam() for i in range(count - enemyCount)])
+    def spriteTick():
+        for sprite in sprites:
+            sprite.previousRect = sprite.rect.copy()
+        sprites.update()
+    spriteTime = timeit.timeit(spriteTick, number = ticks) * 1000.0 / ticks
+    
+    def fieldTime(vectorized):
+        game.rng.seed(BENCHMARK_SEED)
+        previous = game.VECTORIZED, game.VECTORIZE_MIN_CAPACITY
+        game.VECTORIZED = vectorized
+        game.VECTORIZE_MIN_CAPACITY = 0#time each way at every size, whichever the game would choose
+        try:
+            enemies = game.EnemyField(enemyCount)
+            flotsam = game.EnvironmentField(count - enemyCount, game.ENVIRONMENT_START_X, game.ENVIRONMENT_END_X, game.FLOTSAM_IMAGES)
+        finally:
+            game.VECTORIZED, game.VECTORIZE_MIN_CAPACITY = previous
+        for field in (enemies, flotsam):
+            while field.spawn() is not None:
+                pass
+        def fieldTick():
+            for field in (enemies, flotsam):
+                field.rememberPositions()
+                field.update()
+        return timeit.timeit(fieldTick, number = ticks) * 1000.0 / ticks
+    
+    arrayTime = fieldTime(False)
+    vectorizedTime = None
+    if game.numpy is not None:
+        vectorizedTime = fieldTime(True)
+    return spriteTime, arrayTime, vectorizedTime
+
+"""
+Time the collision checks for the given number of enemy cars, spread along the road as in rush hour: the player
+against every car, and the cars against each other. This is done first by testing every car and every pair of cars,
+and then through the lane index. Returns the two average times per tick in milliseconds.
+"""
+def benchmarkTraffic(count, ticks = TRAFFIC_TICKS):
+    game.imageCache.preload(game.SPRITE_IMAGES)
+    player = game.Player()
+    game.audio.stop("engine")
+    player.rect.center = (60, game.LANE_3)
+    
+    previousSpread = game.ENEMY_SPAWN_SPREAD
+    game.ENEMY_SPAWN_SPREAD = game.RUSH_HOUR_SPREAD
+    try:
+        game.rng.seed(BENCHMARK_SEED)
+        enemies = game.EnemyField(count)
+        while enemies.spawn() is not None:
+            pass
+        #record the car positions for every tick first, so both ways check exactly the same scenes
+        scenes = []
+        for i in range(ticks):
+            enemies.update()
+            scenes.append((enemies.x.tolist(), enemies.lane.tolist()))
+    finally:
+        game.ENEMY_SPAWN_SPREAD = previousSpread
+    
+    def run(overlapping, candidatePairs):
+        checker = game.CollisionChecker()
+        enemies.overlapping = overlapping
+        enemies.candidatePairs = candidatePairs
+        seconds = 0.0
+        for x, lane in scenes:
+            for slot in range(count):
+                enemies.x[slot] = x[slot]
+                enemies.lane[slot] = lane[slot]
+                enemies.y[slot] = game.LANES[lane[slot]]
+            enemies.index = None
+            start = timeit.default_timer()
+            checker.collideField(player, enemies)
+            checker.collideWithin(enemies)
+            seconds += timeit.default_timer() - start
+        return seconds * 1000.0 / ticks
+    
+    everyPair = run(lambda rect: game.ObstacleField.overlapping(enemies, rect), lambda: game.ObstacleField.candidatePairs(enemies))
+    del enemies.overlapping, enemies.candidatePairs
+    laneIndex = run(enemies.overlapping, enemies.candidatePairs)
+    return everyPair, laneIndex
+
+"""
+Empty the operating system's file cache so the next start reads every file from the disk. Returns False if this is
+not allowed here (it needs Linux and root)
+"""
+def dropFileCache():
+    try:
+        os.sync()
+        dropCaches = open("/proc/sys/vm/drop_caches", "w")
+        try:
+            dropCaches.write("3")
+        finally:
+            dropCaches.close()
+    except (AttributeError, OSError):
+        return False
+    return True
+
+"""
+Start the game in a new process with the SDL dummy drivers (so the sounds are still decoded, unlike in headless mode),
+decoding its assets on the given number of threads, from the asset archive or from the loose files, and quit at the
+first frame. Returns the seconds from starting the process to the end of the first frame, and the seconds the game
+itself reported from its start
+"""
+def timeStartup(threads, archive):
+    environment = dict(os.environ)
+    del environment["COINCOLLECTOR_HEADLESS"]
+    environment["SDL_VIDEODRIVER"] = "dummy"
+    environment["SDL_AUDIODRIVER"] = "dummy"
+    here = os.path.dirname(os.path.abspath(__file__))
+    start = timeit.default_timer()
+    arguments = [sys.executable, "CoinCollector_v4.py", "--first-frame", "--loader-threads", str(threads)]
+    if not archive:
+        arguments.append("--loose-files")
+    child = subprocess.run(arguments, cwd = here, env = environment,
+                           stdout = subprocess.PIPE, stderr = subprocess.DEVNULL, universal_newlines = True, check = True)
+    total = timeit.default_timer() - start
+    reported = float(child.stdout.split("First frame after ")[1].split()[0])
+    return total, reported
+
+"""
+Time starting the game to its first frame with the assets decoded one at a time and on STARTUP_THREADS threads, from the
+loose files and (if it has been built) from the asset archive, each STARTUP_RUNS times warm and, if coldStarts is
+True, once from a cold start. Returns a list of (threads, archive, cold, warm, coldReported, warmReported) times in
+seconds, the warm times being the fastest of the runs and the cold times None if no cold starts were made, and whether
+the cold starts really were cold
+"""
+def benchmarkStartup(runs = STARTUP_RUNS, coldStarts = False):
+    sources = [False]
+    if os.path.exists(os.path.join(os.path.dirname(os.path.abspath(__file__)), game.ASSET_ARCHIVE)):
+        sources.append(True)
+    results = []
+    cold = True
+    for archive in sources:
+        for threads in (0, STARTUP_THREADS):
+            coldTotal = coldReported = None
+            if coldStarts:
+                cold = dropFileCache() and cold
+                coldTotal, coldReported = timeStartup(threads, archive)
+            warm = [timeStartup(threads, archive) for i in range(runs)]
+            results.append((threads, archive, coldTotal, min([total for total, reported in warm]), coldReported, min([reported for total, reported in warm])))
+    return results, cold
+
+"""
+Time loading every sprite image and the road's image into a new image cache, decoding and converting each image and
+reading them from the surface cache (which is filled first, if needed). Returns the fastest of STARTUP_RUNS loads each
+way in milliseconds, and the bytes the surface cache takes up on the disk
+"""
+def benchmarkSurfaceCache(runs = STARTUP_RUNS):
+    def load(useCache):
+        game.USE_SURFACE_CACHE = useCache
+        cache = game.ImageCache()
+        for fileName in game.SPRITE_IMAGES:
+            cache.addDecoded(fileName, game.decodeImage(fileName))
+        cache.getCrop("background.png", *game.roadArea())
+    
+    try:
+        load(True)
+        decoded = min(timeit.repeat(lambda: load(False), number = 1, repeat = runs)) * 1000.0
+        cached = min(timeit.repeat(lambda: load(True), number = 1, repeat = runs)) * 1000.0
+    finally:
+        game.USE_SURFACE_CACHE = True
+    directory = game.SURFACE_CACHE_DIRECTORY
+    cacheBytes = sum([os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)])
+    return decoded, cached, cacheBytes
+
+"""
+Time stepping the training environments of CoinCollector_env.py with random actions: the real game, and the
+vectorized environment with its default number of games. Returns the environment steps per second of each (one step
+of every game in the vectorized environment counts as that many steps) and the number of games the vectorized
+environment played, or None if NumPy is not installed
+"""
+def benchmarkEnvironments(steps = ENV_STEPS):
+    if game.numpy is None:
+        return None
+    import numpy
+    import CoinCollector_env
+    random = numpy.random.default_rng(BENCHMARK_SEED)
+    
+    env = CoinCollector_env.CoinCollectorEnv()
+    env.reset(BENCHMARK_SEED)
+    actions = random.integers(0, game.screen.get_height(), steps).tolist()
+    start = timeit.default_timer()
+    for action in actions:
+        observation, reward, done, info = env.step(action)
+        if done:
+            env.reset()
+    single = steps / (timeit.default_timer() - start)
+    
+    env = CoinCollector_env.VectorCoinCollectorEnv(seed = BENCHMARK_SEED)
+    env.reset()
+    actions = random.integers(0, game.screen.get_height(), (steps, env.count))
+    start = timeit.default_timer()
+    for action in actions:
+        env.step(action)
+    vectorized = steps * env.count / (timeit.default_timer() - start)
+    return single, vectorized, env.count
+
+"""
+Time drawing a game frame offscreen and making a NumPy array of it, the same frame each time: copying it through
+pygame.image.tostring, and with pixel observers handing out a view of it, half size, and grey. Returns the average
+milliseconds per frame of each as (name, time) pairs, or None if NumPy is not installed
+"""
+def benchmarkPixels(frames = ENV_STEPS):
+    if game.numpy is None:
+        return None
+    import numpy
+    import CoinCollector_env
+    env = CoinCollector_env.CoinCollectorEnv()
+    env.reset(BENCHMARK_SEED)
+    for i in range(100):
+        env.step(game.LANE_2)
+    session = env.session
+    
+    surface = pygame.Surface(game.screen.get_size(), 0, game.screen)
+    def copy():
+        game.drawScene(surface, session.road, session.layers)
+        return numpy.frombuffer(pygame.image.tostring(surface, "RGB"), numpy.uint8).reshape(surface.get_height(), surface.get_width(), 3)
+    
+    times = [("tostring copy", timeit.timeit(copy, number = frames))]
+    for name, scale, grayscale in (("view", 1, False), ("half size", 2, False), ("grey", 1, True)):
+        observer = CoinCollector_env.PixelObserver(scale, grayscale)
+        times.append((name, timeit.timeit(lambda: observer.observe(session), number = frames)))
+    return [(name, seconds * 1000.0 / frames) for name, seconds in times]
+
+def main():
+    before = benchmarkCollisions(False)
+    after = benchmarkCollisions(True)
+    print("Collision checks per frame:")
+    print("  masks built per call:  %.4f ms" % before)
+    print("  cached sprite masks:   %.4f ms" % after)
+    print("  speedup:               %.1fx" % (before / after))
+    
+    maskOnly, twoPhase, checker = benchmarkBroadPhase()
+    print("Broad phase, in-game sprite movement:")
+    print("  mask check only:       %.4f ms" % maskOnly)
+    print("  rect then mask:        %.4f ms" % twoPhase)
+    print("  pairs tested:          %d" % checker.pairsTested)
+    print("  pairs narrowed:        %d" % checker.pairsNarrowed)
+    print("  culling rate:          %.1f%%" % (checker.cullingRate() * 100))
+    
+    wholeImage, cropped, wholeBytes, croppedBytes = benchmarkRoad()
+    print("Road drawing per frame:")
+    print("  whole background:      %.4f ms  (%.1f MB)" % (wholeImage, wholeBytes / 1048576.0))
+    print("  cropped background:    %.4f ms  (%.1f MB)" % (cropped, croppedBytes / 1048576.0))
+    
+    print("Obstacle movement per tick:")
+    for count in OBSTACLE_COUNTS:
+        spriteTime, arrayTime, vectorizedTime = benchmarkObstacles(count)
+        line = "  %4d obstacles:  sprites %.4f ms  field %.4f ms" % (count, spriteTime, arrayTime)
+        if vectorizedTime is not None:
+            line += "  vectorized %.4f ms  (%.1fx)" % (vectorizedTime, spriteTime / vectorizedTime)
+        print(line)
+    
+    coldStarts = "--cold" in sys.argv
+    results, cold = benchmarkStartup(coldStarts = coldStarts)
+    print("Time to first frame (from process start / from game start):")
+    for threads, archive, coldTotal, warmTotal, coldReported, warmReported in results:
+        if threads == 0:
+            name = "one at a time"
+        else:
+            name = "%d threads" % threads
+        if archive:
+            name += ", archive:"
+        else:
+            name += ", loose:"
+        if coldStarts:
+            print("  %-24s  cold %.3f / %.3f s  warm %.3f / %.3f s" % (name, coldTotal, coldReported, warmTotal, warmReported))
+        else:
+            print("  %-24s  warm %.3f / %.3f s" % (name, warmTotal, warmReported))
+    if not coldStarts:
+        print("  (warm starts only; run with --cold to also time cold starts, which empties the machine's file cache)")
+    elif not cold:
+        print("  (the file cache could not be emptied here, so the cold starts may have been partly warm)")
+    if len(results) == 2:
+        print("  (no asset archive has been built, so it was not timed; run CoinCollector_packAssets.py to build it)")
+    
+    decoded, cached, cacheBytes = benchmarkSurfaceCache()
+    print("Loading the images and the road:")
+    print("  decode and convert:    %.3f ms" % decoded)
+    print("  surface cache:         %.3f ms  (%.1f MB on disk)" % (cached, cacheBytes / 1048576.0))
+    
+    environments = benchmarkEnvironments()
+    if environments is not None:
+        single, vectorized, games = environments
+        print("Training environment steps per second:")
+        print("  real game:             %.0f" % single)
+        print("  vectorized, %d games: %.0f  (%.0fx)" % (games, vectorized, vectorized / single))
+    
+    pixels = benchmarkPixels()
+    if pixels is not None:
+        print("Pixel observations per frame (drawing included):")
+        for name, milliseconds in pixels:
+            print("  %-21s  %.4f ms" % (name + ":", milliseconds))
+    
+    print("Dense traffic collision checks per tick:")
+    for count in OBSTACLE_COUNTS:
+        everyPair, laneIndex = benchmarkTraffic(count)
+        print("  %4d cars:  every pair %.4f ms  lane index %.4f ms  (%.1fx)" % (count, everyPair, laneIndex, everyPair / laneIndex))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+# Source File Name: CoinCollector_benchmarkSuite.py
+# Author's Name: Coin Collector contributors
+# Last Modified By: Coin Collector contributors
+# Date Last Modified: October 18, 2026
+"""
+  Program Description:  Performance benchmark suite for every version of Coin Collector (CoinCollector_v1.py to
+  CoinCollector_v4.py). Each version's game() is played headlessly (no window, sound card or mouse) for the same
+  number of frames, with the same random seed and the same scripted steering, so the versions do exactly the same
+  work and can be compared. The player is given enough health that no game ends early.
+
+  Each version runs in its own Python process, so its peak memory is measured on its own. For each version the suite
+  records frames per second, the time spent in each phase of a frame (p50/p95/p99/max), the Python memory allocated
+  while playing, and the peak resident memory of the process. The results are written as JSON:
+
+    python CoinCollector_benchmarkSuite.py [--frames N] [--seed S] [--output FILE] [--versions v1,v2,v3,v4]
+
+  No sound is loaded or played, so versions whose sound files no longer exist can still be measured, and images that
+  no longer exist are replaced with their nearest equivalent. Versions that still cannot run are reported with the
+  error.
+
+"""
+
+import os, sys, json, subprocess, time, tracemalloc
+
+try:
+    import resource#only available on Unix-like systems
+except ImportError:
+    resource = None
+
+VERSIONS = ["v1", "v2", "v3", "v4"]
+SUITE_FRAMES = 3000 #the number of frames each version is played for
+SUITE_SEED = 1 #random seed, so every version sees the same workload
+SUITE_OUTPUT = "benchmark_results.json"
+
+PHASES = ["wait", "events", "collision", "update", "draw", "total"]
+
+#the scripted steering: the mouse y position moves through the lanes, staying in each one for two seconds
+LANE_Y_POSITIONS = [290, 390, 190, 90]
+FRAMES_PER_LANE = 60
+
+#images early versions load that no longer exist, and the image each one is played with instead
+IMAGE_STAND_INS = {"enemyCar.gif": "enemyCar1.gif"}
+
+"""
+The SilentSound class stands in for pygame.mixer.Sound while a version is played: it loads nothing and plays nothing
+"""
+class SilentSound(object):
+    """
+    Constructor for SilentSound
+    """
+    def __init__(self, *args, **kwargs):
+        self.volume = 1.0
+
+    def play(self, *args, **kwargs):
+        return None
+
+    def stop(self):
+        pass
+
+    def fadeout(self, milliseconds):
+        pass
+
+    def set_volume(self, volume):
+        self.volume = volume
+
+    def get_volume(self):
+        return self.volume
+
+    def get_length(self):
+        return 0.0
+
+"""
+Stands in for the pygame.mixer.music functions while a version is played
+"""
+def silent(*args, **kwargs):
+    pass
+
+"""
+Return the scripted mouse y position for the given frame
+"""
+def scriptedY(frame):
+    lane = (frame // FRAMES_PER_LANE) % len(LANE_Y_POSITIONS)
+    return int(LANE_Y_POSITIONS[lane] * 1.1)#undo the reduced mouse sensitivity of later versions
+
+"""
+Return the 50th, 95th and 99th percentile and the maximum of a list of times
+"""
+def percentiles(times):
+    times = sorted(times)
+    if not times:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    last = len(times) - 1
+    return {"p50": times[int(round(last * 0.50))], "p95": times[int(round(last * 0.95))], "p99": times[int(round(last * 0.99))], "max": times[last]}
+
+"""
+The GameDriver class plays a version's game() without a person at the controls. It replaces the parts of pygame the
+game reads input and time from: the mouse returns scripted positions, the clock no longer waits between frames, the
+event queue reports a quit once the frame limit is reached, and sounds and music are silent. Versions without their
+own frame profiler are timed by noting when each phase of the loop starts: the clock tick, the event check, collisions
+(until the first group update), updates (until the first group draw) and drawing (until the display flip).
+"""
+class GameDriver(object):
+    """
+    Constructor for GameDriver
+    """
+    def __init__(self, pygame, frames):
+        self.pygame = pygame
+        self.frames = frames
+        self.frame = 0
+        self.loopStart = None#time the first frame started
+        self.phaseTimes = dict([(phase, []) for phase in PHASES])
+        self.frameStart = None
+        self.lastMark = None
+        self.phase = None#the phase that was last marked in the current frame
+
+    """
+    Record that the given phase of the current frame has just ended
+    """
+    def mark(self, phase):
+        now = time.perf_counter()
+        if self.lastMark is not None and self.phase != phase:
+            self.phaseTimes[phase].append((now - self.lastMark) * 1000.0)
+            self.lastMark = now
+            self.phase = phase
+
+    """
+    Replace the pygame functions the game depends on. Returns a function that puts them back
+    """
+    def install(self):
+        pygame = self.pygame
+        driver = self
+        originals = []
+
+        def replace(owner, name, function):
+            originals.append((owner, name, getattr(owner, name)))
+            setattr(owner, name, function)
+
+        realClock = pygame.time.Clock
+        class UncappedClock(object):
+            def __init__(self):
+                self.clock = realClock()
+            def tick(self, framerate = 0):
+                now = time.perf_counter()
+                if driver.frameStart is not None:
+                    driver.phaseTimes["total"].append((now - driver.frameStart) * 1000.0)
+                if driver.loopStart is None:
+                    driver.loopStart = now
+                driver.frameStart = driver.lastMark = now
+                driver.phase = None
+                result = self.clock.tick()
+                driver.mark("wait")
+                return result
+            def get_fps(self):
+                return self.clock.get_fps()
+        replace(pygame.time, "Clock", UncappedClock)
+
+        realGet = pygame.event.get
+        def getEvents(*args, **kwargs):
+            events = realGet(*args, **kwargs)
+            driver.frame += 1
+            if driver.frame >= driver.frames:
+                events.append(pygame.event.Event(pygame.QUIT))
+            driver.mark("events")
+            return events
+        replace(pygame.event, "get", getEvents)
+
+        def getPosition():
+            return (0, scriptedY(driver.frame))
+        replace(pygame.mouse, "get_pos", getPosition)
+
+        realUpdate = pygame.sprite.AbstractGroup.update
+        def update(group, *args):
+            if driver.phase in ("events", None):
+                driver.mark("collision")
+            return realUpdate(group, *args)
+        replace(pygame.sprite.AbstractGroup, "update", update)
+
+        def markedDraw(realDraw):
+            def draw(group, surface, *args, **kwargs):
+                if driver.phase == "collision":
+                    driver.mark("update")
+                return realDraw(group, surface, *args, **kwargs)
+            return draw
+        for groupClass in (pygame.sprite.AbstractGroup, pygame.sprite.RenderUpdates):
+            replace(groupClass, "draw", markedDraw(groupClass.draw))
+
+        def markedShow(realShow):
+            def show(*args, **kwargs):
+                result = realShow(*args, **kwargs)
+                driver.mark("draw")
+                return result
+            return show
+        for name in ("flip", "update"):
+            replace(pygame.display, name, markedShow(getattr(pygame.display, name)))
+
+        #no sound is measured, so sounds and music are never loaded; this also lets versions whose sound files no
+        #longer exist (yay.ogg, thunder.ogg, Invulnerable.ogg) be played
+        replace(pygame.mixer, "Sound", SilentSound)
+        for name in ("load", "play", "stop", "set_volume"):
+            replace(pygame.mixer.music, name, silent)
+
+        realLoad = pygame.image.load
+        def loadImage(fileName, *args):
+            if isinstance(fileName, str) and not os.path.exists(fileName):
+                fileName = IMAGE_STAND_INS.get(fileName, fileName)
+            return realLoad(fileName, *args)
+        replace(pygame.image, "load", loadImage)
+
+        def uninstall():
+            for owner, name, original in reversed(originals):
+                setattr(owner, name, original)
+        return uninstall
+
+"""
+Return the peak resident memory of this process in kilobytes, or None if it cannot be measured here
+"""
+def peakMemory():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        peak //= 1024#reported in bytes on macOS, kilobytes elsewhere
+    return peak
+
+"""
+Play the given version of the game for the given number of frames and return its results. This runs inside the
+child process for that version.
+"""
+def runVersion(version, frames, seed):
+    os.environ["COINCOLLECTOR_HEADLESS"] = "1"#versions that support headless mode use it
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    import random
+    import pygame
+
+    result = {"version": version, "frames": frames, "seed": seed}
+    try:
+        game = __import__("CoinCollector_" + version)
+        game.HEALTH = 1000000000#so no game ends before the frame limit
+        if hasattr(game, "imageCache"):
+            game.imageCache.preload(game.SPRITE_IMAGES)
+        if hasattr(game, "frameProfiler"):
+            game.frameProfiler.window = frames#keep every frame's times for the statistics
+
+        #timing run
+        random.seed(seed)
+        driver = GameDriver(pygame, frames)
+        uninstall = driver.install()
+        try:
+            game.game()
+        finally:
+            uninstall()
+        seconds = time.perf_counter() - driver.loopStart
+        result["seconds"] = seconds
+        result["framesPerSecond"] = driver.frame / seconds
+        if hasattr(game, "frameProfiler"):
+            result["phaseSource"] = "frame profiler"
+            result["phases"] = dict([(phase, percentiles(game.frameProfiler.times[phase])) for phase in PHASES])
+        else:
+            result["phaseSource"] = "pygame call markers"
+            result["phases"] = dict([(phase, percentiles(driver.phaseTimes[phase])) for phase in PHASES])
+
+        #allocation run: the same game again, with Python's memory allocations traced
+        random.seed(seed)
+        driver = GameDriver(pygame, frames)
+        uninstall = driver.install()
+        blocksBefore = sys.getallocatedblocks()
+        tracemalloc.start()
+        try:
+            game.game()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            uninstall()
+        result["allocations"] = {"tracedPeakBytes": peak, "tracedRetainedBytes": current, "blocksRetained": sys.getallocatedblocks() - blocksBefore}
+    except Exception as error:
+        result["error"] = "%s: %s" % (type(error).__name__, error)
+    result["peakRssKilobytes"] = peakMemory()
+    return result
+
+"""
+Run each version in its own process and collect the results
+"""
+def runSuite(versions, frames, seed):
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for version in versions:
+        child = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", version, "--frames", str(frames), "--seed", str(seed)],
+                               cwd = here, stdout = subprocess.PIPE, stderr = subprocess.PIPE, universal_newlines = True)
+        lines = child.stdout.strip().splitlines()
+        if child.returncode == 0 and lines:
+            results.append(json.loads(lines[-1]))
+        else:
+            results.append({"version": version, "error": "process exited with code %d: %s" % (child.returncode, child.stderr.strip()[-500:])})
+    return results
+
+"""
+Print a short table of the results
+"""
+def printResults(results):
+    print("%-8s %10s %10s %10s %12s  %s" % ("version", "frames/s", "p50 ms", "p99 ms", "peak RSS KB", "notes"))
+    for result in results:
+        if "error" in result:
+            print("%-8s %10s %10s %10s %12s  %s" % (result["version"], "-", "-", "-", result.get("peakRssKilobytes") or "-", result["error"]))
+        else:
+            total = result["phases"]["total"]
+            print("%-8s %10.0f %10.3f %10.3f %12s  phases from %s" % (result["version"], result["framesPerSecond"], total["p50"], total["p99"], result["peakRssKilobytes"] or "-", result["phaseSource"]))
+
+"""
+Return the value following the given command line option, or the default if the option was not given
+"""
+def optionValue(option, default):
+    if option in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(option) + 1]
+    return default
+
+def main():
+    frames = int(optionValue("--frames", SUITE_FRAMES))
+    seed = int(optionValue("--seed", SUITE_SEED))
+
+    #when run as the child process for one version, play it and report back on the last line of output
+    child = optionValue("--child", None)
+    if child is not None:
+        print(json.dumps(runVersion(child, frames, seed)))
+        return
+
+    versions = optionValue("--versions", ",".join(VERSIONS)).split(",")
+    output = optionValue("--output", SUITE_OUTPUT)
+    results = runSuite(versions, frames, seed)
+    printResults(results)
+
+    report = {"frames": frames, "seed": seed, "python": sys.version.split()[0], "platform": sys.platform, "results": results}
+    resultsFile = open(output, "w")
+    try:
+        json.dump(report, resultsFile, indent = 2)
+    finally:
+        resultsFile.close()
+    print("Results written to %s" % output)
+
+if __name__ == "__main__":
+    main()
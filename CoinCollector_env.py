@@ -0,0 +1,469 @@
+# Source File Name: CoinCollector_env.py
+# Author's Name: Coin Collector contributors
+# Last Modified By: Coin Collector contributors
+# Date Last Modified: October 18, 2026
+"""
+  Program Description:  Training environments for Coin Collector driving agents, in the style of OpenAI Gym: reset()
+  starts a game and returns the first observation, and step(action) plays one tick and returns (observation, reward,
+  done, info). Nothing is drawn and nothing waits for the clock, so games run as fast as the rules can be played.
+
+    - CoinCollectorEnv plays the real game of CoinCollector_v4.py (a GameSession), with the action standing in for
+      the mouse. It is exactly the game a person plays, and can only run one game at a time.
+    - VectorCoinCollectorEnv plays many independent games in lockstep, all of their state kept in NumPy arrays with
+      one row per game, so a step of every game is a few array operations. It follows the same rules with two
+      simplifications: collisions are checked between rects rather than collision masks, and power-ups are never
+      put to sleep off the screen. Games that end are started again straight away.
+
+  The action is the y position on the screen the player's car should move to (the car stays between 60 and 410).
+  The observation is an array of OBSERVATION_SIZE numbers: the car's y position (as a fraction of the screen
+  height), its health (as a fraction of HEALTH), 1 if it is invulnerable or 0 if not, then, for each kind of object
+  (enemy cars, flotsam, coins and power-ups) and each lane, the distance from the front of the car to the nearest
+  such object in that lane that has not yet passed it, as a fraction of the screen width (1 if there is none in
+  sight). The reward is the change in score, plus HEALTH_REWARD for every point of health gained (or minus it for
+  every point lost).
+
+  Agents that learn from the picture instead can give CoinCollectorEnv a PixelObserver, which draws each tick's
+  frame offscreen and returns it as a NumPy array: a view straight into the frame's pixels, optionally shrunk or
+  grey, worked out into surfaces and arrays that are made once and reused.
+
+"""
+
+import os
+os.environ["COINCOLLECTOR_HEADLESS"] = "1"#no window or sound; must be set before the game is imported
+
+import numpy, pygame
+import CoinCollector_v4 as game
+
+ENV_MAX_STEPS = 9000 #the most steps a game lasts before it is ended (five minutes of play)
+VECTOR_ENV_COUNT = 256 #the number of games a vectorized environment plays at once by default
+HEALTH_REWARD = 25 #the reward for each point of health gained, in points of score
+
+PIXEL_SCALE = 1 #pixel observations are shrunk by this factor in each direction (1 keeps the full size)
+PIXEL_GRAYSCALE = False #whether pixel observations are grey rather than colour
+
+PLAYER_X = 60 #the player's car is always centred at this x position
+PLAYER_MIN_Y = 60 #the car cannot leave the road: it stays centred between these y positions
+PLAYER_MAX_Y = 410
+
+OBJECT_KINDS = ["enemy", "flotsam", "coin", "powerup"] #the kinds of object in the observation, in order
+OBSERVATION_SIZE = 3 + len(OBJECT_KINDS) * len(game.LANES)
+
+"""
+Return the lane (index into LANES) nearest each of the given y positions
+"""
+def nearestLane(y):
+    return numpy.abs(numpy.asarray(y)[..., None] - numpy.array(game.LANES)).argmin(-1)
+
+"""
+Return, for each game (row) and lane, the distance from the front of the player's car to the nearest object ahead of
+it in that lane as a fraction of the screen width, or 1 if there is none. Each argument has one row per game and one
+column per object: the left and right edges of the objects, their lanes, and whether they are in play
+"""
+def laneDistances(left, right, lanes, active, playerLeft, playerRight):
+    ahead = active & (right > playerLeft)
+    distance = numpy.clip((left - playerRight) / float(game.screen.get_width()), 0.0, 1.0)
+    distances = numpy.ones((left.shape[0], len(game.LANES)), numpy.float32)
+    if left.shape[1] > 0:
+        for lane in range(len(game.LANES)):
+            distances[:, lane] = numpy.where(ahead & (lanes == lane), distance, 1.0).min(axis = 1)
+    return distances
+
+"""
+Return the observations made from the given player and object positions, one row per game. Each of objects is the
+(left, right, lanes, active) of one kind of object, in the order of OBJECT_KINDS
+"""
+def observe(playerY, health, invulnerable, objects, playerLeft, playerRight):
+    columns = [numpy.asarray(playerY, numpy.float32)[:, None] / game.screen.get_height(),
+               numpy.asarray(health, numpy.float32)[:, None] / game.HEALTH,
+               numpy.asarray(invulnerable, numpy.float32)[:, None]]
+    for left, right, lanes, active in objects:
+        columns.append(laneDistances(left, right, lanes, active, playerLeft, playerRight))
+    return numpy.concatenate(columns, axis = 1)
+
+"""
+The PixelObserver class draws game frames onto an offscreen surface and hands them out as NumPy arrays of (height,
+width, 3) colours, or (height, width) greys. A colour frame is a view of the surface's own pixels, from
+pygame.surfarray.pixels3d, so nothing is copied. Frames shrunk by the given scale are drawn full size and then
+smooth-scaled (averaging each scale-by-scale block of pixels) onto a smaller surface that is made once, and grey
+frames are weighted sums of red, green and blue worked out in place into arrays that are also made once, so no new
+surfaces or arrays are made each frame.
+
+The surfaces and grey arrays handed out are kept twice over and used in turn, so an observation stays as it is while
+the next one is made (an agent usually still holds the last observation when it takes its next step). A view locks
+its surface, and a locked surface cannot be drawn on, so if a frame older than that is still held its surface is
+left to it and a new one is made. Copy an observation to keep it for longer than one step
+"""
+class PixelObserver(object):
+    """
+    Constructor for PixelObserver
+    """
+    def __init__(self, scale = PIXEL_SCALE, grayscale = PIXEL_GRAYSCALE):
+        width, height = game.screen.get_size()
+        if width % scale or height % scale:
+            raise ValueError("the screen size must be a multiple of the scale")
+        self.grayscale = grayscale
+        self.size = (width // scale, height // scale)
+        self.canvas = None#the full size surface frames are drawn on before they are shrunk
+        if scale > 1:
+            self.canvas = pygame.Surface((width, height), 0, game.screen)
+        self.frames = [self.newFrame(), self.newFrame()]
+        self.turn = 0#which of the two frames and grey arrays the last observation used
+        self.pixels = None#the view of the last frame's pixels, (height, width, 3)
+        
+        #the arrays grey frames are worked out in
+        self.weighted = numpy.zeros(self.size[::-1], numpy.uint16)#the weighted sum of a pixel's colours, then its grey
+        self.channel = numpy.zeros(self.size[::-1], numpy.uint16)
+        self.gray = [numpy.zeros(self.size[::-1], numpy.uint8) for i in range(2)]
+    
+    """
+    Return a new surface for a frame, in the display's pixel format
+    """
+    def newFrame(self):
+        return pygame.Surface(self.size, 0, game.screen)
+    
+    """
+    Draw the given game session as it is now, and return the observation of it
+    """
+    def observe(self, session):
+        self.turn = 1 - self.turn
+        self.pixels = None#let go of the last view; the agent may still hold it, but that locks the other frame
+        frame = self.frames[self.turn]
+        if frame.get_locked():#a frame from before the last one is still held
+            frame = self.frames[self.turn] = self.newFrame()
+        if self.canvas is None:
+            game.drawScene(frame, session.road, session.layers)
+        else:
+            game.drawScene(self.canvas, session.road, session.layers)
+            pygame.transform.smoothscale(self.canvas, self.size, frame)
+        self.pixels = pygame.surfarray.pixels3d(frame).transpose(1, 0, 2)#surfarray is indexed by x first
+        if self.grayscale:
+            return self.grayFrame(self.pixels)
+        return self.pixels
+    
+    """
+    Return the given colour pixels in grey, worked out into this turn's grey array
+    """
+    def grayFrame(self, pixels):
+        #grey = (77 red + 150 green + 29 blue) / 256, the usual luminance weights in whole numbers
+        numpy.multiply(pixels[:, :, 0], 77, out = self.weighted, dtype = numpy.uint16)
+        numpy.multiply(pixels[:, :, 1], 150, out = self.channel, dtype = numpy.uint16)
+        numpy.add(self.weighted, self.channel, out = self.weighted)
+        numpy.multiply(pixels[:, :, 2], 29, out = self.channel, dtype = numpy.uint16)
+        numpy.add(self.weighted, self.channel, out = self.weighted)
+        numpy.right_shift(self.weighted, 8, out = self.weighted)
+        gray = self.gray[self.turn]
+        numpy.copyto(gray, self.weighted, casting = "unsafe")
+        return gray
+
+"""
+The ActionInput class is the input source for the player in CoinCollectorEnv: the mouse position it returns is the
+one that moves the car to the y position of the last action
+"""
+class ActionInput(object):
+    """
+    Constructor for ActionInput
+    """
+    def __init__(self):
+        self.y = 0
+
+    def getPosition(self):
+        return (0, self.y)
+
+"""
+The CoinCollectorEnv class plays one real game of Coin Collector, a tick at a time, for an agent. If it is given a
+PixelObserver, the observations are the game's frames as drawn by the observer
+"""
+class CoinCollectorEnv(object):
+    """
+    Constructor for CoinCollectorEnv
+    """
+    def __init__(self, maxSteps = ENV_MAX_STEPS, pixelObserver = None):
+        game.loadAssets()
+        self.maxSteps = maxSteps
+        self.pixelObserver = pixelObserver
+        self.input = ActionInput()
+        self.session = None
+
+    """
+    Start a new game, with the given seed if one is given, and return the first observation
+    """
+    def reset(self, seed = None):
+        self.session = game.GameSession(self.input, seed)
+        #the car only reaches the road on its first tick, so start it in the middle of the road, as
+        #VectorCoinCollectorEnv does, for the first observation
+        middle = (PLAYER_MIN_Y + PLAYER_MAX_Y) // 2
+        self.session.player.rect.centery = middle
+        self.input.y = int(round(middle * 1.1))
+        return self.observation()
+
+    """
+    Play one tick with the car steered to the given y position. Returns (observation, reward, done, info)
+    """
+    def step(self, action):
+        session = self.session
+        score = session.scoreboard.score
+        health = session.scoreboard.health
+        self.input.y = int(round(action * 1.1))#the player reduces the mouse's movement by 10%
+        session.tick()
+        reward = session.scoreboard.score - score + HEALTH_REWARD * (session.scoreboard.health - health)
+        done = session.over or session.frames >= self.maxSteps
+        info = {"score": session.scoreboard.score, "health": session.scoreboard.health, "frames": session.frames,
+                "hitCar": session.player.hitCar, "hitFlotsam": session.player.hitFlotsam, "hitPowerup": session.player.hitPowerup}
+        if done:
+            session.record()
+        return self.observation(), reward, done, info
+
+    """
+    Return the observation of the game as it is now
+    """
+    def observation(self):
+        session = self.session
+        if self.pixelObserver is not None:
+            return self.pixelObserver.observe(session)
+        player = session.player.rect
+        objects = []
+        for field in (session.enemies, session.flotsam):
+            count = field.count
+            x = numpy.asarray(field.x[:count])
+            width = numpy.asarray(field.width[:count])
+            left = x - width // 2
+            objects.append((left[None, :], (left + width)[None, :], nearestLane(field.y[:count])[None, :], numpy.ones((1, count), bool)))
+        for sprites in ([session.coin], [session.repair, session.star]):
+            left = numpy.array([[sprite.rect.left for sprite in sprites]])
+            right = numpy.array([[sprite.rect.right for sprite in sprites]])
+            lanes = nearestLane([[sprite.rect.centery for sprite in sprites]])
+            active = numpy.array([[sprite.alive() for sprite in sprites]])
+            objects.append((left, right, lanes, active))
+        return observe([player.centery], [session.scoreboard.health], [session.player.invulnerable], objects, player.left, player.right)[0]
+
+"""
+The VectorCoinCollectorEnv class plays the given number of games at once, each step playing one tick of every game.
+Every object's position is a NumPy array with one row per game and one column per object. Each of reset() and
+step() take and return arrays with one row per game
+"""
+class VectorCoinCollectorEnv(object):
+    """
+    Constructor for VectorCoinCollectorEnv
+    """
+    def __init__(self, count = VECTOR_ENV_COUNT, seed = None, maxSteps = ENV_MAX_STEPS):
+        game.loadAssets()
+        self.count = count
+        self.maxSteps = maxSteps
+        self.random = numpy.random.default_rng(seed)
+        self.games = numpy.arange(count)
+
+        #the sizes of everything, from their images
+        self.playerWidth, self.playerHeight = game.imageCache.get("playerCar.gif").get_size()
+        self.carWidth, self.carHeight = game.imageCache.get(game.WITH_ENEMY_IMAGES[0]).get_size()
+        self.flotsamSizes = numpy.array([game.imageCache.get(fileName).get_size() for fileName in game.FLOTSAM_IMAGES])
+        self.coinSize = game.imageCache.get("coin.gif").get_size()
+        #the repair and star power-ups, side by side: their sizes, and the range of x positions each starts from
+        powerupSizes = numpy.array([game.imageCache.get("fix.gif").get_size(), game.imageCache.get("star.gif").get_size()])
+        self.powerupWidth = powerupSizes[:, 0]
+        self.powerupHeight = powerupSizes[:, 1]
+        self.powerupStart = numpy.array([game.REPAIR_START_X, game.STAR_START_X])
+        self.powerupEnd = numpy.array([game.REPAIR_END_X, game.STAR_END_X])
+        self.playerLeft = PLAYER_X - self.playerWidth // 2
+        self.playerRight = self.playerLeft + self.playerWidth
+
+        def integers(*shape):
+            return numpy.zeros((count,) + shape, numpy.int32)
+        self.playerY = integers()
+        self.health = integers()
+        self.score = integers()
+        self.frames = integers()
+        self.invulnerable = numpy.zeros(count, bool)
+        self.blank = numpy.zeros(count, bool)#whether the flashing car is showing its blank frame, which touches nothing
+        self.invulnerableElapsed = integers()
+        self.invulnerableDuration = integers()
+        self.hitCar = integers()
+        self.hitFlotsam = integers()
+        self.hitPowerup = integers()
+        self.enemyX = integers(game.ENEMY_COUNT)
+        self.enemyLane = integers(game.ENEMY_COUNT)
+        self.enemyDx = integers(game.ENEMY_COUNT)
+        self.flotsamX = integers(game.FLOTSAM_COUNT)
+        self.flotsamY = integers(game.FLOTSAM_COUNT)
+        self.flotsamWidth = integers(game.FLOTSAM_COUNT)
+        self.flotsamHeight = integers(game.FLOTSAM_COUNT)
+        self.coinX = integers(1)
+        self.coinY = integers(1)
+        self.powerupX = integers(2)
+        self.powerupY = integers(2)
+
+    """
+    Start every game again and return the first observations
+    """
+    def reset(self):
+        self.resetGames(numpy.ones(self.count, bool))
+        return self.observation()
+
+    """
+    Start again the games chosen by the given boolean array
+    """
+    def resetGames(self, games):
+        everySlot = games[:, None]
+        self.playerY[games] = (PLAYER_MIN_Y + PLAYER_MAX_Y) // 2
+        self.health[games] = game.HEALTH
+        self.score[games] = 0
+        self.frames[games] = 0
+        self.invulnerable[games] = False
+        self.blank[games] = False
+        self.invulnerableElapsed[games] = 0
+        self.invulnerableDuration[games] = game.FRAMES_PER_SECOND
+        self.hitCar[games] = 0
+        self.hitFlotsam[games] = 0
+        self.hitPowerup[games] = 0
+        self.resetEnemies(everySlot & numpy.ones(self.enemyX.shape, bool))
+        #flotsam keeps the size of the image it is first given, as in the game
+        flotsam = everySlot & numpy.ones(self.flotsamX.shape, bool)
+        sizes = self.flotsamSizes[self.random.integers(0, len(self.flotsamSizes), flotsam.sum())]
+        self.flotsamWidth[flotsam] = sizes[:, 0]
+        self.flotsamHeight[flotsam] = sizes[:, 1]
+        self.resetFlotsam(flotsam)
+        self.resetCoins(everySlot)
+        self.resetPowerups(everySlot & numpy.ones(self.powerupX.shape, bool))
+
+    """
+    Put the enemy cars chosen by the given boolean array back at the start, in a random lane at a random speed
+    """
+    def resetEnemies(self, slots):
+        count = slots.sum()
+        lanes = self.random.integers(0, len(game.LANES), count)
+        x = numpy.full(count, game.ENEMY_START_X)
+        if game.ENEMY_SPAWN_SPREAD > 0:
+            x += self.random.integers(0, game.ENEMY_SPAWN_SPREAD, count)
+        self.enemyX[slots] = x
+        self.enemyLane[slots] = lanes
+        self.enemyDx[slots] = self.random.integers(13, 15, count) + (lanes <= 1) * game.SCROLL_SPEED#the first two lanes are oncoming
+
+    """
+    Put the flotsam chosen by the given boolean array back at a random place ahead
+    """
+    def resetFlotsam(self, slots):
+        count = slots.sum()
+        self.flotsamX[slots] = self.random.integers(game.ENVIRONMENT_START_X, game.ENVIRONMENT_END_X, count)
+        self.flotsamY[slots] = self.random.integers(75, game.screen.get_height() - 75, count)
+
+    """
+    Put the coins chosen by the given boolean array back at a random place ahead
+    """
+    def resetCoins(self, slots):
+        count = slots.sum()
+        self.coinX[slots] = self.random.integers(game.ENVIRONMENT_START_X, game.ENVIRONMENT_END_X, count)
+        self.coinY[slots] = self.random.integers(75, game.screen.get_height() - 75, count)
+
+    """
+    Put the power-ups chosen by the given boolean array back at a random place ahead
+    """
+    def resetPowerups(self, slots):
+        kinds = numpy.nonzero(slots)[1]#0 for a repair, 1 for a star
+        self.powerupX[slots] = self.random.integers(self.powerupStart[kinds], self.powerupEnd[kinds])
+        self.powerupY[slots] = self.random.integers(75, game.screen.get_height() - 75, len(kinds))
+
+    """
+    Return which of the objects with the given centres and sizes (one row per game) overlap the player's car
+    """
+    def touching(self, x, y, width, height):
+        left = x - width // 2
+        top = y - height // 2
+        playerTop = self.playerY[:, None] - self.playerHeight // 2
+        return (left < self.playerRight) & (left + width > self.playerLeft) & (top < playerTop + self.playerHeight) & (top + height > playerTop)
+
+    """
+    Play one tick of every game, each car steered to the y position given for its game. Returns (observations,
+    rewards, dones, info). Games that ended are started again, so the observations of those are of their new games;
+    info holds the final score, health, frames and hits of every game, read before any were started again
+    """
+    def step(self, actions):
+        score = self.score.copy()
+        health = self.health.copy()
+        self.frames += 1
+        self.score += 1
+
+        #check collisions, before anything moves
+        lanes = numpy.array(game.LANES)
+        enemies = self.touching(self.enemyX, lanes[self.enemyLane], self.carWidth, self.carHeight)
+        flotsam = self.touching(self.flotsamX, self.flotsamY, self.flotsamWidth, self.flotsamHeight)
+        visible = ~self.blank[:, None]
+        coins = self.touching(self.coinX, self.coinY, self.coinSize[0], self.coinSize[1]) & visible
+        powerups = self.touching(self.powerupX, self.powerupY, self.powerupWidth, self.powerupHeight) & visible
+
+        self.resetCoins(coins)
+        self.score += coins[:, 0] * game.COIN_SCORE
+
+        #hits only count while the car is not invulnerable, and only then are the obstacles hit reset
+        vulnerable = ~self.invulnerable
+        hitCar = enemies.any(axis = 1) & vulnerable
+        hitFlotsam = flotsam.any(axis = 1) & vulnerable
+        self.invulnerable |= hitCar | hitFlotsam
+        self.health -= hitCar * game.CAR_DAMAGE + hitFlotsam * game.FLOTSAM_DAMAGE
+        self.hitCar += hitCar
+        self.hitFlotsam += hitFlotsam
+        self.resetEnemies(enemies & hitCar[:, None])
+        self.resetFlotsam(flotsam & hitFlotsam[:, None])
+
+        repair = powerups[:, 0]
+        star = powerups[:, 1]
+        self.resetPowerups(powerups)
+        self.hitPowerup += repair.astype(numpy.int32) + star
+        self.health = numpy.where(repair & (self.health <= 100), numpy.minimum(self.health + game.REPAIR_HEALTH, 100), self.health).astype(numpy.int32)
+        self.invulnerable |= star
+        self.invulnerableDuration[star] = game.STAR_DURATION
+
+        #cars that touch another car ahead of them in the same lane are reset
+        if self.enemyX.shape[1] > 1:
+            sameLane = self.enemyLane[:, :, None] == self.enemyLane[:, None, :]
+            close = numpy.abs(self.enemyX[:, :, None] - self.enemyX[:, None, :]) < self.carWidth
+            earlier = numpy.tri(self.enemyX.shape[1], k = -1, dtype = bool).T#[first, second] is True when first < second
+            self.resetEnemies((sameLane & close & earlier).any(axis = 1))
+
+        #move everything
+        self.flotsamX -= game.SCROLL_SPEED
+        self.resetFlotsam(self.flotsamX < game.RESET_POINT)
+        self.coinX -= game.SCROLL_SPEED
+        self.resetCoins(self.coinX < game.RESET_POINT)
+        self.powerupX -= game.SCROLL_SPEED
+        self.resetPowerups(self.powerupX < game.RESET_POINT)
+        self.playerY[:] = numpy.clip(actions, PLAYER_MIN_Y, PLAYER_MAX_Y)
+        self.updateInvulnerability()
+        self.enemyX -= self.enemyDx
+        self.resetEnemies(self.enemyX < game.RESET_POINT)
+
+        rewards = self.score - score + HEALTH_REWARD * (self.health - health)
+        dones = (self.health <= 0) | (self.frames >= self.maxSteps)
+        info = {"score": self.score.copy(), "health": self.health.copy(), "frames": self.frames.copy(),
+                "hitCar": self.hitCar.copy(), "hitFlotsam": self.hitFlotsam.copy(), "hitPowerup": self.hitPowerup.copy()}
+        if dones.any():
+            self.resetGames(dones)
+        return self.observation(), rewards, dones, info
+
+    """
+    Count down each invulnerable car's time, flashing it as the player's car does, and end the invulnerability of
+    those whose time is up
+    """
+    def updateInvulnerability(self):
+        counting = self.invulnerable & (self.invulnerableElapsed < self.invulnerableDuration)
+        ending = self.invulnerable & ~counting
+        self.invulnerableElapsed += counting
+        step = (self.invulnerableElapsed - 1) // game.INVULNERABLE_FRAME_LENGTH
+        animation = numpy.array(game.INVULNERABLE_ANIMATION)
+        self.blank = counting & (animation[step % len(animation)] == game.PLAYER_BLANK)
+        self.invulnerableElapsed[ending] = 0
+        self.invulnerableDuration[ending] = game.FRAMES_PER_SECOND
+        self.invulnerable &= ~ending
+
+    """
+    Return the observations of every game as they are now
+    """
+    def observation(self):
+        count = self.count
+        enemyLeft = self.enemyX - self.carWidth // 2
+        flotsamLeft = self.flotsamX - self.flotsamWidth // 2
+        coinLeft = self.coinX - self.coinSize[0] // 2
+        powerupLeft = self.powerupX - self.powerupWidth // 2
+        objects = [(enemyLeft, enemyLeft + self.carWidth, self.enemyLane, numpy.ones(self.enemyX.shape, bool)),
+                   (flotsamLeft, flotsamLeft + self.flotsamWidth, nearestLane(self.flotsamY), numpy.ones(self.flotsamX.shape, bool)),
+                   (coinLeft, coinLeft + self.coinSize[0], nearestLane(self.coinY), numpy.ones((count, 1), bool)),
+                   (powerupLeft, powerupLeft + self.powerupWidth, nearestLane(self.powerupY), numpy.ones((count, 2), bool))]
+        return observe(self.playerY, self.health, self.invulnerable, objects, self.playerLeft, self.playerRight)
@@ -0,0 +1,41 @@
+# Source File Name: CoinCollector_leaderboard.py
+# Author's Name: Coin Collector contributors
+# Last Modified By: Coin Collector contributors
+# Date Last Modified: October 18, 2026
+"""
+  Program Description:  The leaderboard protocol, shared by the game's leaderboard client (CoinCollector_v4.py) and
+  the stand-in leaderboard server (CoinCollector_leaderboardServer.py). It needs nothing but the standard library, so
+  the server can use it without starting pygame.
+
+  Kiosks connect over TCP and send JSON objects, one per line, each answered by one line:
+
+    {"type": "submit", "kiosk": NAME, "games": [{"id": ..., "score": ..., ...}, ...]}  ->  {"accepted": [ids]}
+    {"type": "top", "count": N}  ->  {"scores": [{"kiosk": ..., "score": ..., ...}, ...]}
+
+  Anything else is answered with {"error": message}. A game the server already has (the same kiosk and id) is
+  accepted again without being counted twice, so kiosks can safely send a batch again when a reply is lost.
+
+"""
+
+import asyncio, json
+
+BATCH_SIZE = 50 #the most games a kiosk sends in one request
+TOP_COUNT = 10 #the number of best games sent when a "top" request gives no count
+MAX_TOP_COUNT = 100 #the most games sent for one "top" request
+REQUEST_TIMEOUT = 5.0 #in seconds, the longest the server is given to connect or reply
+
+"""
+Send the given message over an open connection and return the reply. Raises ConnectionError if the other end hangs
+up, asyncio.TimeoutError if it takes longer than the given number of seconds, and ValueError if it replies with an
+error
+"""
+async def request(reader, writer, message, timeout = REQUEST_TIMEOUT):
+    writer.write(json.dumps(message).encode("utf-8") + b"\n")
+    await asyncio.wait_for(writer.drain(), timeout)
+    line = await asyncio.wait_for(reader.readline(), timeout)
+    if not line:
+        raise ConnectionError("the leaderboard server hung up")
+    reply = json.loads(line.decode("utf-8"))
+    if "error" in reply:
+        raise ValueError(reply["error"])
+    return reply
@@ -0,0 +1,196 @@
+# Source File Name: CoinCollector_leaderboardServer.py
+# Author's Name: Coin Collector contributors
+# Last Modified By: Coin Collector contributors
+# Date Last Modified: October 18, 2026
+"""
+  Program Description:  Stand-in leaderboard server for CoinCollector_v4.py, so the leaderboard can be tried out and
+  load-tested on a machine with no network. It keeps every game sent to it in memory, ranked by score:
+
+    python CoinCollector_leaderboardServer.py [--port N] [--fail-rate F] [--latency SECONDS]
+    python CoinCollector_v4.py --leaderboard 127.0.0.1:8765 [--kiosk NAME]
+
+  --fail-rate hangs up on that fraction of requests (e.g. 0.3) and --latency waits before each reply, to see how the
+  game copes with a poor connection. Stopping the server and starting it again shows the game keeping its games while
+  the server is away and sending them once it is back.
+
+  The protocol is described in CoinCollector_leaderboard.py, which is all the server shares with the game, so it
+  runs without pygame and never opens a window.
+
+  Run with --load-test KIOSKS [--games N] to start the server and that many simulated kiosks in the same process,
+  each sending N games in batches and fetching the top scores after each batch, as the game does. It reports the
+  requests and games per second the server handled and the time kiosks waited for replies.
+
+"""
+
+import asyncio, bisect, json, random, sys, time
+
+import CoinCollector_leaderboard as protocol
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+LOAD_TEST_GAMES = 200 #the number of games each simulated kiosk sends
+
+"""
+The Leaderboard class holds every game sent to the server. The ranking is kept sorted as games come in, so fetching
+the top scores never sorts
+"""
+class Leaderboard(object):
+    """
+    Constructor for Leaderboard
+    """
+    def __init__(self):
+        self.games = {}#(kiosk, id) to game
+        self.ranking = []#(-score, played, kiosk, id) of every game, best first
+
+    """
+    Add the given kiosk's games, ignoring any already added. Returns the ids of the games, all of which are now held
+    """
+    def submit(self, kiosk, games):
+        accepted = []
+        for result in games:
+            key = (kiosk, int(result["id"]))
+            if key not in self.games:
+                result = dict(result)
+                result["kiosk"] = kiosk
+                self.games[key] = result
+                bisect.insort(self.ranking, (-int(result["score"]), float(result["played"]), kiosk, key[1]))
+            accepted.append(key[1])
+        return accepted
+
+    """
+    Return the given number of best games
+    """
+    def top(self, count):
+        return [self.games[(kiosk, gameId)] for score, played, kiosk, gameId in self.ranking[:count]]
+
+"""
+The LeaderboardServer class answers the kiosks' requests. Each connection is served by its own coroutine, so a slow
+kiosk never holds up the others
+"""
+class LeaderboardServer(object):
+    """
+    Constructor for LeaderboardServer
+    """
+    def __init__(self, failRate = 0.0, latency = 0.0):
+        self.leaderboard = Leaderboard()
+        self.failRate = failRate
+        self.latency = latency
+        self.random = random.Random()
+        self.requests = 0
+        self.dropped = 0
+
+    """
+    Return the reply to the given request
+    """
+    def reply(self, request):
+        if request.get("type") == "submit":
+            return {"accepted": self.leaderboard.submit(str(request["kiosk"]), request["games"])}
+        if request.get("type") == "top":
+            return {"scores": self.leaderboard.top(min(int(request.get("count", protocol.TOP_COUNT)), protocol.MAX_TOP_COUNT))}
+        return {"error": "unknown request type %r" % request.get("type")}
+
+    """
+    Serve one kiosk's connection until it hangs up
+    """
+    async def serve(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                if self.random.random() < self.failRate:
+                    self.dropped += 1
+                    break#as if the connection was lost before the reply
+                try:
+                    reply = self.reply(json.loads(line.decode("utf-8")))
+                except (ValueError, KeyError, TypeError) as error:
+                    reply = {"error": "bad request: %s" % error}
+                writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    """
+    Start listening on the given address. Returns the asyncio server
+    """
+    async def listen(self, host, port):
+        return await asyncio.start_server(self.serve, host, port)
+
+"""
+Play the part of one kiosk in the load test: send the given number of games in batches, fetching the top scores after
+each batch. Returns the time waited for each reply, in milliseconds
+"""
+async def simulatedKiosk(kiosk, games, port):
+    reader, writer = await asyncio.open_connection(SERVER_HOST, port)
+    waits = []
+    played = time.time()
+    try:
+        for first in range(0, games, protocol.BATCH_SIZE):
+            batch = [{"id": gameId + 1, "played": played + gameId, "score": random.randint(0, 5000), "frames": 900,
+                      "seconds": 30.0, "hitCar": 1, "hitFlotsam": 2, "hitPowerup": 3}
+                     for gameId in range(first, min(first + protocol.BATCH_SIZE, games))]
+            for message in ({"type": "submit", "kiosk": "kiosk%d" % kiosk, "games": batch}, {"type": "top", "count": protocol.TOP_COUNT}):
+                start = time.perf_counter()
+                await protocol.request(reader, writer, message)
+                waits.append((time.perf_counter() - start) * 1000.0)
+    finally:
+        writer.close()
+    return waits
+
+"""
+Start a server and the given number of simulated kiosks at once, and report how the server coped
+"""
+async def loadTest(kiosks, games, port):
+    server = LeaderboardServer()
+    listener = await server.listen(SERVER_HOST, port)
+    try:
+        start = time.perf_counter()
+        waits = await asyncio.gather(*[simulatedKiosk(kiosk, games, port) for kiosk in range(kiosks)])
+        seconds = time.perf_counter() - start
+    finally:
+        listener.close()
+        await listener.wait_closed()
+    waits = sorted([wait for kioskWaits in waits for wait in kioskWaits])
+    last = len(waits) - 1
+    held = len(server.leaderboard.games)
+    print("%d kiosks sent %d games in %d requests in %.2f seconds: %.0f requests and %.0f games per second" % (kiosks, held, server.requests, seconds,
+          server.requests / seconds, held / seconds))
+    print("reply wait in ms: p50 %.2f  p95 %.2f  p99 %.2f  max %.2f" % (waits[int(round(last * 0.50))], waits[int(round(last * 0.95))],
+          waits[int(round(last * 0.99))], waits[last]))
+
+"""
+Run the server until it is interrupted
+"""
+async def runServer(port, failRate, latency):
+    server = LeaderboardServer(failRate, latency)
+    listener = await server.listen(SERVER_HOST, port)
+    print("Leaderboard server listening on %s:%d" % (SERVER_HOST, port))
+    async with listener:
+        await listener.serve_forever()
+
+"""
+Return the value following the given command line option, or the default if the option was not given
+"""
+def optionValue(option, default):
+    if option in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(option) + 1]
+    return default
+
+def main():
+    port = int(optionValue("--port", SERVER_PORT))
+    kiosks = optionValue("--load-test", None)
+    try:
+        if kiosks is not None:
+            asyncio.run(loadTest(int(kiosks), int(optionValue("--games", LOAD_TEST_GAMES)), port))
+        else:
+            asyncio.run(runServer(port, float(optionValue("--fail-rate", 0.0)), float(optionValue("--latency", 0.0))))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# Source File Name: CoinCollector_packAssets.py
+# Author's Name: Coin Collector contributors
+# Last Modified By: Coin Collector contributors
+# Date Last Modified: October 18, 2026
+"""
+  Program Description:  Build step for CoinCollector_v4.py. Packs every image, sound and music file next to the game
+  into a single indexed archive, which the game then memory-maps at startup and reads its assets from instead of
+  opening each loose file. Run it again whenever an asset changes:
+
+    python CoinCollector_packAssets.py [--output FILE]
+
+  The game falls back to the loose files when there is no archive, or when it is started with --loose-files.
+
+"""
+
+import os
+os.environ["COINCOLLECTOR_HEADLESS"] = "1"#no window or sound; must be set before the game is imported
+
+import glob, sys
+import CoinCollector_v4 as game
+
+ASSET_PATTERNS = ["*.gif", "*.png", "*.ogg", "*.mp3"] #the files that are packed
+
+"""
+Return the value following the given command line option, or the default if the option was not given
+"""
+def optionValue(option, default):
+    if option in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(option) + 1]
+    return default
+
+def main():
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))#the game looks for its assets next to itself
+    output = optionValue("--output", game.ASSET_ARCHIVE)
+    assetNames = []
+    for pattern in ASSET_PATTERNS:
+        assetNames += glob.glob(pattern)
+    assetNames.sort()
+    game.writeAssetArchive(output, assetNames)
+    print("Packed %d assets (%.1f MB) into %s" % (len(assetNames), os.path.getsize(output) / 1048576.0, output))
+
+if __name__ == "__main__":
+    main()
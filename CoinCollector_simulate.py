@@ -0,0 +1,210 @@
+# Source File Name: CoinCollector_simulate.py
+# Author's Name: Coin Collector contributors
+# Last Modified By: Coin Collector contributors
+# Date Last Modified: October 18, 2026
+"""
+  Program Description:  Monte Carlo balance simulator for CoinCollector_v4.py. Plays thousands of headless games
+  (no window, sound or drawing) with a computer driver instead of a person, for every combination of a grid of game
+  constants, so the effect of, say, a cheaper repair or a rarer star can be measured rather than guessed:
+
+    python CoinCollector_simulate.py [--games N] [--frames N] [--seed S] [--policy random|lanes]
+                                     [--processes N] [--output FILE] [--sweep NAME=V1,V2,...] ...
+
+  For example, --sweep REPAIR_HEALTH=20,30,40 --sweep CAR_DAMAGE=15,20 plays --games games at each of the six
+  combinations. The games are shared out over a pool of processes, one per core by default, which each load the
+  game's assets once and then play game after game, so a sweep runs faster in proportion to the number of cores.
+
+  Every game's result (survival time, score, hits of each kind) is written to the results file as soon as it comes
+  in, one JSON object per line, followed by a summary of each combination. Games end when the player runs out of
+  health or after --frames ticks, whichever comes first.
+
+"""
+
+import os
+os.environ["COINCOLLECTOR_HEADLESS"] = "1"#no window or sound; must be set before the game is imported
+
+import itertools, json, multiprocessing, random, sys, time
+
+SIMULATION_GAMES = 200 #the number of games played for each combination of constants
+SIMULATION_FRAMES = 9000 #the most ticks a game lasts (five minutes of play)
+SIMULATION_SEED = 1 #games are seeded from this, so a sweep gives the same results every time it is run
+SIMULATION_POLICY = "random"
+SIMULATION_OUTPUT = "simulation_results.jsonl"
+GAMES_PER_TASK = 4 #the number of games handed to a process at a time
+
+#the game constants that can be swept
+SWEEPABLE = ["HEALTH", "COIN_SCORE", "REPAIR_HEALTH", "STAR_DURATION", "CAR_DAMAGE", "FLOTSAM_DAMAGE",
+             "ENVIRONMENT_START_X", "ENVIRONMENT_END_X", "REPAIR_START_X", "REPAIR_END_X", "STAR_START_X", "STAR_END_X",
+             "ENEMY_COUNT", "FLOTSAM_COUNT"]
+
+#the random driver stays in a lane for between these numbers of ticks before picking another one
+RANDOM_LANE_MIN = 10
+RANDOM_LANE_MAX = 90
+
+game = None#the game module, imported by each process of the pool
+defaults = {}#the game's own value of every sweepable constant
+
+"""
+The RandomInput class is an input source that drives like a distracted player: it picks a lane at random, stays in
+it for a random number of ticks, then picks another. It has its own random generator, so it does not change the
+random choices the game itself makes
+"""
+class RandomInput(object):
+    """
+    Constructor for RandomInput
+    """
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        self.y = 0
+        self.framesLeft = 0
+
+    """
+    Return the mouse position for the next tick
+    """
+    def getPosition(self):
+        if self.framesLeft <= 0:
+            self.y = int(self.random.choice(game.LANES) * 1.1)#undo the player's reduced mouse sensitivity
+            self.framesLeft = self.random.randint(RANDOM_LANE_MIN, RANDOM_LANE_MAX)
+        self.framesLeft -= 1
+        return (0, self.y)
+
+"""
+Run once in each process of the pool: import the game and load its assets, ready to play
+"""
+def startWorker():
+    global game
+    import CoinCollector_v4
+    game = CoinCollector_v4
+    game.RENDER_MODE = "none"#nobody is watching, so nothing is drawn
+    for name in SWEEPABLE:
+        defaults[name] = getattr(game, name)
+    game.loadAssets()
+
+"""
+Play the given games with the given constants, returning the result of each. A task is (combination number,
+constants, policy, frames, seeds)
+"""
+def playGames(task):
+    combination, constants, policy, frames, seeds = task
+    for name in SWEEPABLE:
+        setattr(game, name, constants.get(name, defaults[name]))
+    results = []
+    for seed in seeds:
+        if policy == "lanes":
+            inputSource = game.laneChangeInput()
+        else:
+            inputSource = RandomInput(seed)
+        game.game(inputSource, frames, seed)
+        stats = game.gameStats
+        results.append({"combination": combination, "seed": seed, "frames": stats.frames, "died": stats.health <= 0,
+                        "score": stats.score, "health": stats.health, "hitCar": stats.hitCar,
+                        "hitFlotsam": stats.hitFlotsam, "hitPowerup": stats.hitPowerup})
+    return results
+
+"""
+Return every combination of the swept constants, as a list of dictionaries from constant name to value. The sweeps
+are (name, list of values) pairs
+"""
+def combinations(sweeps):
+    names = [name for name, values in sweeps]
+    return [dict(zip(names, values)) for values in itertools.product(*[values for name, values in sweeps])]
+
+"""
+Return the 5th, 50th and 95th percentile, the mean and the minimum and maximum of a list of numbers
+"""
+def distribution(values):
+    values = sorted(values)
+    last = len(values) - 1
+    return {"mean": sum(values) / float(len(values)), "min": values[0], "p5": values[int(round(last * 0.05))],
+            "p50": values[int(round(last * 0.50))], "p95": values[int(round(last * 0.95))], "max": values[last]}
+
+"""
+Return the summary of one combination's games
+"""
+def summarize(combination, constants, results):
+    summary = {"summary": combination, "constants": constants, "games": len(results),
+               "deathRate": sum([result["died"] for result in results]) / float(len(results))}
+    for key in ["frames", "score", "hitCar", "hitFlotsam", "hitPowerup"]:
+        summary[key] = distribution([result[key] for result in results])
+    return summary
+
+"""
+Play every game of the sweep on a pool of the given number of processes, writing each result to the output file as
+it comes in and then the summary of each combination. Returns the summaries
+"""
+def simulate(sweeps, games, frames, seed, policy, processes, output):
+    points = combinations(sweeps)
+    tasks = []
+    for combination, constants in enumerate(points):
+        #every combination plays the same seeds, so the differences between them come from the constants alone
+        seeds = [seed * 1000003 + i for i in range(games)]
+        for first in range(0, games, GAMES_PER_TASK):
+            tasks.append((combination, constants, policy, frames, seeds[first:first + GAMES_PER_TASK]))
+
+    resultsFile = open(output, "w")
+    try:
+        resultsFile.write(json.dumps({"sweeps": dict(sweeps), "games": games, "frames": frames, "seed": seed, "policy": policy, "processes": processes}) + "\n")
+        byCombination = [[] for constants in points]
+        pool = multiprocessing.Pool(processes, startWorker)
+        try:
+            #results come back in whatever order they finish, so a slow combination never holds up the file
+            for results in pool.imap_unordered(playGames, tasks):
+                for result in results:
+                    byCombination[result["combination"]].append(result)
+                    resultsFile.write(json.dumps(result) + "\n")
+                resultsFile.flush()
+        finally:
+            pool.close()
+            pool.join()
+        summaries = [summarize(combination, points[combination], byCombination[combination]) for combination in range(len(points))]
+        for summary in summaries:
+            resultsFile.write(json.dumps(summary) + "\n")
+    finally:
+        resultsFile.close()
+    return summaries
+
+"""
+Return the (name, list of values) of each --sweep option given on the command line
+"""
+def sweepOptions():
+    sweeps = []
+    for i in range(1, len(sys.argv) - 1):
+        if sys.argv[i] == "--sweep":
+            name, values = sys.argv[i + 1].split("=", 1)
+            if name not in SWEEPABLE:
+                raise SystemExit("%s cannot be swept; choose from %s" % (name, ", ".join(SWEEPABLE)))
+            sweeps.append((name, [int(value) for value in values.split(",")]))
+    return sweeps
+
+"""
+Return the value following the given command line option, or the default if the option was not given
+"""
+def optionValue(option, default):
+    if option in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(option) + 1]
+    return default
+
+def main():
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))#the game looks for its assets next to itself
+    games = int(optionValue("--games", SIMULATION_GAMES))
+    frames = int(optionValue("--frames", SIMULATION_FRAMES))
+    seed = int(optionValue("--seed", SIMULATION_SEED))
+    policy = optionValue("--policy", SIMULATION_POLICY)
+    processes = int(optionValue("--processes", multiprocessing.cpu_count()))
+    output = optionValue("--output", SIMULATION_OUTPUT)
+    sweeps = sweepOptions()
+
+    start = time.perf_counter()
+    summaries = simulate(sweeps, games, frames, seed, policy, processes, output)
+    seconds = time.perf_counter() - start
+
+    print("%-40s %7s %9s %9s %7s %7s" % ("constants", "deaths", "frames", "score", "cars", "flotsam"))
+    for summary in summaries:
+        constants = " ".join(["%s=%d" % (name, value) for name, value in sorted(summary["constants"].items())]) or "(defaults)"
+        print("%-40s %6.0f%% %9.0f %9.0f %7.2f %7.2f" % (constants, summary["deathRate"] * 100, summary["frames"]["mean"],
+              summary["score"]["mean"], summary["hitCar"]["mean"], summary["hitFlotsam"]["mean"]))
+    played = games * len(summaries)
+    print("%d games in %.1f seconds on %d processes (%.1f games per second); results written to %s" % (played, seconds, processes, played / seconds, output))
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 # Source File Name: CoinCollector.py
 # Author's Name: Michael Burnie
-# Last Modified By: Michael Burnie
-# Date Last Modified: July 07, 2013
+# Last Modified By: Coin Collector contributors
+# Date Last Modified: October 18, 2026
 """ 
   Program Description:  This program is built from MailPilot.py. It uses the horizontal axis as a backdrop for 
   a mouse-driven game. The objective is to steer the car into the coins while avoiding obstacles, such as oncoming
@@ -17,12 +17,31 @@
     
 """
 
-import pygame, random
+import array, asyncio, bisect, collections, concurrent.futures, hashlib, heapq, io, itertools, json, mmap, os, pygame, queue, random, socket, sqlite3, struct, sys, threading, time
+import CoinCollector_leaderboard as leaderboardProtocol
+
+STARTUP_START = time.perf_counter()#when the game started loading, for measuring the time to its first frame
+
+try:
+    import numpy
+except ImportError:
+    numpy = None#the obstacle fields fall back to the standard library's arrays
+
+#run without a window, sound or mouse (e.g. on a build server with no GPU or sound card) when started with --headless
+#or with the COINCOLLECTOR_HEADLESS environment variable set to 1. This must be decided before pygame starts up
+HEADLESS = "--headless" in sys.argv or os.environ.get("COINCOLLECTOR_HEADLESS") == "1"
+if HEADLESS:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
 pygame.init()
 
 screen = pygame.display.set_mode((640, 480))#640x480 resolution
 
-FRAMES_PER_SECOND = 30
+FRAMES_PER_SECOND = 30 #the speed the game itself runs at: the number of game ticks per second
+RENDER_FRAMES_PER_SECOND = 30 #the most frames drawn per second, 0 for no limit. Run with --fps N to change this
+MAX_TICKS_PER_FRAME = 5 #the most ticks played before drawing a frame; beyond this a slow machine slows the game down
+INTERPOLATION_LIMIT = 100 #sprites that moved further than this in one tick jumped (e.g. reset) and are not drawn in between
+HEADLESS_FRAMES = 3000 #the number of frames a headless game runs for when started from the command line
 HEALTH = 100 #player's health
 SCROLL_SPEED = 20 #movement speed of the background
 
@@ -31,11 +50,37 @@ LANE_1 = 90
 LANE_2 = 190
 LANE_3 = 290
 LANE_4 = 390
+LANES = [LANE_1, LANE_2, LANE_3, LANE_4]
 
 RESET_POINT = -50 #the point at which objects will reset, must be negative
 
+#the road's centre x position when it starts scrolling, and the position at which it jumps back to the start
+ROAD_START_X = 4000
+ROAD_RESET_X = -3420
+
 COIN_SCORE = 500 #the number of points a coin awards the player
 
+#the number of each kind of obstacle on the road at once
+ENEMY_COUNT = 2
+FLOTSAM_COUNT = 3
+NON_COLLIDE_COUNT = 2
+
+ENEMY_START_X = 750 #the x position enemy cars start from when they reset
+ENEMY_SPAWN_SPREAD = 0 #if above 0, enemy cars start up to this much further along the road, so they are spread out
+
+#"rush hour": the road filled with many more cars and much more flotsam. Run with --rush-hour to play it
+RUSH_HOUR_ENEMIES = 100
+RUSH_HOUR_FLOTSAM = 100
+RUSH_HOUR_SPREAD = 6000
+
+#move the obstacles with NumPy, all at once, if it is installed. Run with --no-numpy to move them one at a time.
+#NumPy has a fixed cost for every call, so only fields with room for at least VECTORIZE_MIN_CAPACITY obstacles are
+#vectorized: below that (as in a normal game, with a handful of obstacles) the standard library's arrays are faster.
+#CoinCollector_benchmark.py times both ways at several sizes
+VECTORIZED = numpy is not None
+VECTORIZE_MIN_CAPACITY = 150
+LANE_INDEX_MIN_COUNT = 4 #enemy cars are only indexed by lane when at least this many are on the road
+
 #The start and end x values for in-game objects. A random value will be chosen between the start and end x
 #values to determine how frequently objects appear
 ENVIRONMENT_START_X = 850
@@ -47,25 +92,1436 @@ STAR_END_X = 30000
 
 REPAIR_HEALTH = 30 #the amount of health the repair powerup heals
 
+#the health the player loses when hitting an enemy car or flotsam
+CAR_DAMAGE = 20
+FLOTSAM_DAMAGE = 10
+
 STAR_DURATION = 210 #in frames, the duration of the star invulnerability state
 
+#the number of threads that decode the images and sounds at startup; 0 decodes them one at a time on the main
+#thread. Run with --loader-threads N to change this. The assets are small and most of the work (converting and
+#building masks) is done on the main thread anyway, so a pool measured no faster to the first frame than decoding
+#them one at a time (0.22-0.27 s against 0.23-0.28 s with 4 threads), and 0 is the default
+ASSET_LOADER_THREADS = 0
+LOADING_SCREEN_INTERVAL = 0.1 #in seconds, the least time between redraws of the loading screen's progress bar
+
+#run with --first-frame to quit as soon as the first screen has been drawn, printing the time it took to get there
+FIRST_FRAME_ONLY = False
+
+#the archive the assets are packed into by CoinCollector_packAssets.py. When it exists the assets are read from it,
+#otherwise from the loose files. Run with --loose-files to ignore the archive
+ASSET_ARCHIVE = "CoinCollector_assets.pak"
+ASSET_ARCHIVE_ID = b"CCA1"
+ASSET_ARCHIVE_HEADER = struct.Struct("<4sII") #identifier, number of assets, length of the index
+USE_ASSET_ARCHIVE = True
+
+#images converted to the display's pixel format are kept in this directory, so later runs do not have to decode and
+#convert them again. Run with --no-surface-cache to decode every image
+SURFACE_CACHE_DIRECTORY = "CoinCollector_cache"
+SURFACE_CACHE_ID = b"CCS1"
+SURFACE_CACHE_HEADER = struct.Struct("<4sIII") #identifier, number of Surfaces, width and height of the image file
+SURFACE_CACHE_ENTRY = struct.Struct("<IIIBI") #width, height, pitch, whether it has a colour key and the key, then pixels
+USE_SURFACE_CACHE = True
+
+#how the game screen is drawn: "flip" redraws and flips the whole screen every frame, and "none" draws nothing at all,
+#for headless games nobody will see (e.g. CoinCollector_simulate.py)
+RENDER_MODE = "flip"
+
+#frame timing: each frame of the game is split into these phases and each phase is timed. The last PROFILE_WINDOW
+#frames are kept for the timing statistics. Run with --profile to show the statistics on the screen while playing,
+#and with --trace FILE to save the time of every phase of every frame to a .json or .csv file when the game ends
+PROFILE_PHASES = ["wait", "events", "collision", "update", "draw"]
+PROFILE_WINDOW = 300
+PROFILE_OVERLAY_INTERVAL = 15 #the number of frames between updates of the on-screen statistics
+PROFILE_OVERLAY = False
+TRACE_FILE = None
+
+#the result of every game played from the instructions screen is kept in this SQLite database. Results are written in
+#batches of up to SCORE_BATCH_SIZE, at most SCORE_FLUSH_INTERVAL seconds after they come in. Run with --high-scores
+#to print the best HIGH_SCORE_COUNT games, and with --no-scores to play without recording
+SCORE_DATABASE = "CoinCollector_scores.db"
+SCORE_BATCH_SIZE = 64
+SCORE_FLUSH_INTERVAL = 2.0
+HIGH_SCORE_COUNT = 10
+RECORD_SCORES = True
+
+#the central leaderboard every kiosk sends its games to, as "host:port", or None to keep scores on this machine only.
+#Run with --leaderboard HOST:PORT to sync with one, and --kiosk NAME to name this machine there (by default its
+#host name). CoinCollector_leaderboardServer.py is a stand-in server for testing. The instructions screen switches
+#between the instructions and the leaderboard every LEADERBOARD_SHOW_SECONDS seconds
+LEADERBOARD_SERVER = None
+KIOSK_NAME = socket.gethostname()
+LEADERBOARD_BATCH_SIZE = leaderboardProtocol.BATCH_SIZE #the most games sent in one request
+LEADERBOARD_SYNC_INTERVAL = 10.0 #in seconds, how often the leaderboard is fetched when nothing new has been played
+LEADERBOARD_TIMEOUT = leaderboardProtocol.REQUEST_TIMEOUT #in seconds, the longest the server is given to connect or reply
+LEADERBOARD_RETRY_MIN = 1.0 #in seconds, the wait after a failure to reach the server, doubling after each one...
+LEADERBOARD_RETRY_MAX = 60.0 #...up to this
+LEADERBOARD_SHOW_SECONDS = 5
+
+#indexes into the player's table of animation frames
+PLAYER_NORMAL = 0
+PLAYER_BLANK = 1
+PLAYER_FADED = 2
+FADED_ALPHA = 120 #the transparency of the faded player frame, from 0 (invisible) to 255 (solid)
+
+#the frames the player car cycles through while invulnerable, and how many game frames each one is shown for.
+#Use, for example, [PLAYER_FADED, PLAYER_NORMAL] for a softer flash
+INVULNERABLE_ANIMATION = [PLAYER_BLANK, PLAYER_NORMAL]
+INVULNERABLE_FRAME_LENGTH = 1
+
 #game volume
 MUSIC_VOLUME = 0.6
 SOUND_VOLUME = 0.5
 
+#every sound effect by name, the volume of those that are not played at SOUND_VOLUME, and the category each belongs to
+SOUND_FILES = {"engine": "engine.ogg", "crash": "crash.ogg", "hit": "hit1.ogg", "fix": "fix.ogg", "coin": "coin.ogg", "invulnerable": "invulnerable.ogg"}
+SOUND_VOLUMES = {"crash": SOUND_VOLUME + 0.5}
+SOUND_CATEGORIES = {"engine": "engine", "crash": "crash", "hit": "crash", "fix": "pickup", "coin": "pickup", "invulnerable": "pickup"}
+SOUND_CHANNELS = {"engine": 1, "crash": 2, "pickup": 3} #the number of mixer channels kept for each category
+SOUND_REPEAT_GAP = 80 #in milliseconds, the shortest time between two plays of the same sound
+
+#the images each kind of sprite can randomly choose between
+FLOTSAM_IMAGES = ["barrel.gif", "crate.gif", "muffler.gif", "tire.gif", "pylon.gif"]
+NON_COLLIDE_IMAGES = ["crack1.gif", "crack2.gif", "crack3.gif", "crack4.gif", "crack5.gif", "crack6.gif", "crack7.gif", "leaf1.gif", "grass1.gif", "leaf2.gif", "tiremarks.gif"]
+ONCOMING_ENEMY_IMAGES = ["oncomingEnemyCar1.gif", "oncomingEnemyCar2.gif"]
+WITH_ENEMY_IMAGES = ["enemyCar1.gif", "enemyCar2.gif"]
+
+#every sprite image used in-game; these are all loaded once at startup
+SPRITE_IMAGES = ["playerCar.gif", "blankCar.gif", "coin.gif", "fix.gif", "star.gif"] + FLOTSAM_IMAGES + NON_COLLIDE_IMAGES + ONCOMING_ENEMY_IMAGES + WITH_ENEMY_IMAGES
+
+"""
+The ArchiveFile class is a read-only file over one asset's bytes in a memory-mapped archive. pygame reads from it
+like any other file, straight out of the mapping: the asset is never copied into a bytes object of its own.
+"""
+class ArchiveFile(io.RawIOBase):
+    """
+    Constructor for ArchiveFile
+    """
+    def __init__(self, data):
+        io.RawIOBase.__init__(self)
+        self.data = data#a memoryview of the asset's bytes
+        self.position = 0
+    
+    def readable(self):
+        return True
+    
+    def seekable(self):
+        return True
+    
+    """
+    Copy the next bytes of the asset into the given buffer, returning how many were copied
+    """
+    def readinto(self, buffer):
+        count = max(0, min(len(buffer), len(self.data) - self.position))
+        buffer[:count] = self.data[self.position:self.position + count]
+        self.position += count
+        return count
+    
+    def seek(self, offset, whence = io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += len(self.data)
+        self.position = max(0, offset)
+        return self.position
+    
+    def tell(self):
+        return self.position
+
+"""
+The AssetArchive class reads the game's assets out of a single archive file, built from the loose asset files by
+CoinCollector_packAssets.py. The archive is memory-mapped, so opening an asset costs no system calls at all and
+the operating system pages in only the parts that are read. An archive is this header (identifier, number of
+assets, length of the index), then the index (JSON: each file name and the offset and size of its bytes), then
+the bytes of every asset, stored as they are: the images and sounds are already compressed.
+"""
+class AssetArchive(object):
+    """
+    Constructor for AssetArchive
+    """
+    def __init__(self):
+        self.index = {}#file name -> (offset, size)
+        self.mapping = None
+        self.fileName = None
+    
+    """
+    Map the given archive, after which the assets in it are read from it rather than from loose files
+    """
+    def mount(self, fileName):
+        archive = open(fileName, "rb")
+        try:
+            mapping = mmap.mmap(archive.fileno(), 0, access = mmap.ACCESS_READ)
+        finally:
+            archive.close()#the mapping stays valid after the file is closed
+        archiveId, count, indexSize = ASSET_ARCHIVE_HEADER.unpack_from(mapping)
+        if archiveId != ASSET_ARCHIVE_ID:
+            mapping.close()
+            raise ValueError("%s is not a Coin Collector asset archive" % fileName)
+        start = ASSET_ARCHIVE_HEADER.size
+        index = json.loads(mapping[start:start + indexSize].decode("utf-8"))
+        start += indexSize#where the assets' bytes begin
+        self.index = dict([(name, (start + offset, size)) for name, (offset, size) in index.items()])
+        self.mapping = mapping
+        self.fileName = fileName
+    
+    """
+    Return True if the given asset is in the mounted archive
+    """
+    def __contains__(self, fileName):
+        return fileName in self.index
+    
+    """
+    Return the bytes of the given asset, out of the archive if it is in there, otherwise from its loose file
+    """
+    def read(self, fileName):
+        entry = self.index.get(fileName)
+        if entry is None:
+            asset = open(fileName, "rb")
+            try:
+                return asset.read()
+            finally:
+                asset.close()
+        offset, size = entry
+        return memoryview(self.mapping)[offset:offset + size]
+    
+    """
+    Return the given asset from the archive as a file, or the file name itself if it is not in the archive
+    """
+    def open(self, fileName):
+        entry = self.index.get(fileName)
+        if entry is None:
+            return fileName
+        offset, size = entry
+        return ArchiveFile(memoryview(self.mapping)[offset:offset + size])
+
+assetArchive = AssetArchive()#the game's assets, once the archive is mounted; until then assets are loose files
+
+"""
+Write the given asset files into a new archive with the given name, in the format AssetArchive reads
+"""
+def writeAssetArchive(fileName, assetNames):
+    index = {}
+    offset = 0#offsets are counted from the end of the index, so they do not depend on the index's own length
+    for name in assetNames:
+        size = os.path.getsize(name)
+        index[name] = (offset, size)
+        offset += size
+    index = json.dumps(index, sort_keys = True).encode("utf-8")
+    
+    archive = open(fileName, "wb")
+    try:
+        archive.write(ASSET_ARCHIVE_HEADER.pack(ASSET_ARCHIVE_ID, len(assetNames), len(index)))
+        archive.write(index)
+        for name in assetNames:
+            asset = open(name, "rb")
+            try:
+                archive.write(asset.read())
+            finally:
+                asset.close()
+    finally:
+        archive.close()
+
+"""
+Decode the given image, from the asset archive if it is in there
+"""
+def loadImage(fileName):
+    return pygame.image.load(assetArchive.open(fileName), fileName)
+
+"""
+The DecodedImage class is an image file as read by decodeImage: either the converted pixels of its Surfaces from the
+surface cache, or, if they were not in the cache, the decoded image, which still has to be converted
+"""
+class DecodedImage(object):
+    """
+    Constructor for DecodedImage
+    """
+    def __init__(self, fileName, variant, key, pixels, sourceSize, image):
+        self.fileName = fileName
+        self.variant = variant#what was made from the image, e.g. the road's crop; "" for the image itself
+        self.key = key#the surface cache key of the file's contents and the display format, None if not cached
+        self.pixels = pixels#(width, height, pitch, colour key, bytes) of each Surface, None on a cache miss
+        self.sourceSize = sourceSize#(width, height) of the image file
+        self.image = image#the decoded, unconverted image on a cache miss
+
+"""
+The SurfaceCache class keeps images on the disk after they have been converted to the display's pixel format, so
+later runs of the game copy their pixels straight into new Surfaces rather than decoding each GIF and PNG and
+converting it again. Each entry is named after the image and keyed by a hash of the image file and the display's
+pixel format, so an entry is never used once the image or the display format changes, and it is replaced the next
+time the image is converted. An entry is this header (identifier, number of Surfaces, width and height of the image
+file), then the width, height, pitch and transparent colour key of each Surface followed by its pixels.
+"""
+class SurfaceCache(object):
+    """
+    Constructor for SurfaceCache
+    """
+    def __init__(self):
+        self.format = None#the display's pixel format, as text, once it is known
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+    
+    """
+    Return the cache key for the given image file: a hash of its contents and of the display's pixel format
+    """
+    def key(self, fileName):
+        if self.format is None:
+            self.format = "%d %d %s" % (screen.get_bitsize(), screen.get_bytesize(), " ".join(["%x" % mask for mask in screen.get_masks()]))
+        digest = hashlib.sha1(assetArchive.read(fileName))
+        digest.update(self.format.encode("utf-8"))
+        return digest.hexdigest()
+    
+    """
+    Return the file name of the entry for the given image, variant and key. The name starts with the image and variant,
+    so older entries for the same image can be found and removed
+    """
+    def path(self, fileName, variant, key):
+        name = fileName
+        if variant:
+            name += "@" + variant
+        return os.path.join(SURFACE_CACHE_DIRECTORY, "%s.%s.surface" % (name, key))
+    
+    """
+    Read the given image's entry, if it is cached, returning (width, height, pitch, colour key, bytes) of each Surface
+    and the size of the image file, or None. Safe to run on any thread
+    """
+    def read(self, fileName, variant, key):
+        try:
+            entry = open(self.path(fileName, variant, key), "rb")
+        except (IOError, OSError):
+            return None
+        try:
+            data = entry.read()
+        finally:
+            entry.close()
+        try:
+            cacheId, count, sourceWidth, sourceHeight = SURFACE_CACHE_HEADER.unpack_from(data)
+            if cacheId != SURFACE_CACHE_ID:
+                return None
+            offset = SURFACE_CACHE_HEADER.size
+            pixels = []
+            for i in range(count):
+                width, height, pitch, hasColorKey, colorKey = SURFACE_CACHE_ENTRY.unpack_from(data, offset)
+                if not hasColorKey:
+                    colorKey = None
+                offset += SURFACE_CACHE_ENTRY.size
+                pixels.append((width, height, pitch, colorKey, data[offset:offset + pitch * height]))
+                offset += pitch * height
+        except struct.error:
+            return None#a damaged entry is treated as a miss and replaced
+        if offset != len(data):
+            return None
+        return pixels, (sourceWidth, sourceHeight)
+    
+    """
+    Return the cached Surfaces of the given decoded image, or None if they have to be converted from the image
+    """
+    def surfaces(self, decoded):
+        if decoded.pixels is None:
+            self.misses += 1
+            return None
+        surfaces = []
+        for width, height, pitch, colorKey, pixels in decoded.pixels:
+            surface = pygame.Surface((width, height), 0, screen)
+            if surface.get_pitch() != pitch:
+                self.misses += 1#the display's rows are padded differently after all; convert the image again
+                return None
+            surface.get_buffer().write(pixels)
+            if colorKey is not None:
+                surface.set_colorkey(surface.unmap_rgb(colorKey))#e.g. the transparent colour of a GIF
+            surfaces.append(surface)
+        self.hits += 1
+        return surfaces
+    
+    """
+    Save the given converted Surfaces of a decoded image, replacing any older entries for the same image and variant
+    """
+    def write(self, decoded, surfaces):
+        if decoded.key is None:
+            return
+        fileName = self.path(decoded.fileName, decoded.variant, decoded.key)
+        try:
+            if not os.path.isdir(SURFACE_CACHE_DIRECTORY):
+                os.makedirs(SURFACE_CACHE_DIRECTORY)
+            prefix = os.path.basename(fileName)[:-len(decoded.key) - len(".surface")]
+            for oldName in os.listdir(SURFACE_CACHE_DIRECTORY):
+                if oldName.startswith(prefix) and oldName.endswith(".surface") and "." not in oldName[len(prefix):-len(".surface")]:
+                    os.remove(os.path.join(SURFACE_CACHE_DIRECTORY, oldName))
+            entry = open(fileName + ".tmp", "wb")
+            try:
+                entry.write(SURFACE_CACHE_HEADER.pack(SURFACE_CACHE_ID, len(surfaces), decoded.sourceSize[0], decoded.sourceSize[1]))
+                for surface in surfaces:
+                    colorKey = surface.get_colorkey()
+                    if colorKey is None:
+                        entry.write(SURFACE_CACHE_ENTRY.pack(surface.get_width(), surface.get_height(), surface.get_pitch(), 0, 0))
+                    else:
+                        entry.write(SURFACE_CACHE_ENTRY.pack(surface.get_width(), surface.get_height(), surface.get_pitch(), 1, surface.map_rgb(colorKey)))
+                    entry.write(surface.get_buffer().raw)
+            finally:
+                entry.close()
+            os.replace(fileName + ".tmp", fileName)#so a game that is quit halfway through never leaves half an entry
+            self.writes += 1
+        except (IOError, OSError) as error:
+            print("could not cache %s: %s" % (decoded.fileName, error))#the game still runs, it just converts again next time
+
+surfaceCache = SurfaceCache()#the converted images kept on the disk between runs
+
+"""
+Return the surface cache variant for an image cropped by ImageCache.getCrop
+"""
+def cropVariant(firstX, lastX):
+    return "crop%d_%d" % (firstX, lastX)
+
+"""
+Read the given image for the image cache: its converted Surfaces from the surface cache if they are there, otherwise
+the decoded image. The variant names what is made from the image, e.g. the road's crop. Safe to run on any thread
+"""
+def decodeImage(fileName, variant = ""):
+    key = None
+    if USE_SURFACE_CACHE:
+        key = surfaceCache.key(fileName)
+        cached = surfaceCache.read(fileName, variant, key)
+        if cached is not None:
+            pixels, sourceSize = cached
+            return DecodedImage(fileName, variant, key, pixels, sourceSize, None)
+    image = loadImage(fileName)
+    return DecodedImage(fileName, variant, key, None, image.get_size(), image)
+
+"""
+The ImageCache class holds every sprite image used by the game. Each file is decoded and converted only once,
+after which the same Surface is handed out to every sprite that asks for it, so resetting a sprite mid-game
+never has to read from the disk. Hits and misses are counted to confirm this. The collision mask of each image
+is also built once and shared, so collide_mask never has to build a mask during the game. Converted images are
+also kept in the surface cache for the next run.
+"""
+class ImageCache(object):
+    """
+    Constructor for ImageCache
+    """
+    def __init__(self):
+        self.images = {}#file name -> converted Surface
+        self.masks = {}#file name -> collision Mask of that Surface
+        self.crops = {}#(file name, first x, last x) -> cropped Surface
+        self.sizes = {}#file name -> (width, height) of images that are only kept cropped
+        self.hits = 0#number of requests answered from the cache
+        self.misses = 0#number of requests that had to load from the disk
+    
+    """
+    Load and convert each of the given files ahead of time. Files that are already cached are skipped.
+    """
+    def preload(self, fileNames):
+        for fileName in fileNames:
+            if fileName not in self.images:
+                self.addDecoded(fileName, decodeImage(fileName))
+    
+    """
+    Return the shared Surface for the given file, loading it only if it has not been loaded yet
+    """
+    def get(self, fileName):
+        image = self.images.get(fileName)
+        if image is None:
+            self.misses += 1
+            image = self.addDecoded(fileName, decodeImage(fileName))
+        else:
+            self.hits += 1
+        return image
+    
+    """
+    Add an image that has already been decoded (e.g. by loadAssets) to the cache, converting it and building its mask.
+    Returns the converted Surface
+    """
+    def add(self, fileName, image):
+        image = image.convert()
+        self.images[fileName] = image
+        self.masks[fileName] = pygame.mask.from_surface(image)
+        return image
+    
+    """
+    Add an image read by decodeImage (e.g. on one of loadAssets' threads) to the cache, taking its Surface from the
+    surface cache if it was there, otherwise converting it and saving it to the surface cache. Returns the Surface
+    """
+    def addDecoded(self, fileName, decoded):
+        surfaces = surfaceCache.surfaces(decoded)
+        if surfaces is not None:
+            image = surfaces[0]
+            self.images[fileName] = image
+            self.masks[fileName] = pygame.mask.from_surface(image)
+            return image
+        image = self.add(fileName, decoded.image or loadImage(fileName))
+        surfaceCache.write(decoded, [image])
+        return image
+    
+    """
+    Return the shared collision mask for the given file
+    """
+    def getMask(self, fileName):
+        if fileName not in self.masks:
+            self.get(fileName)
+        return self.masks[fileName]
+    
+    """
+    Return the given image cropped to the part from firstX to lastX, which are measured from the centre of the image.
+    The image is loaded, converted and cropped once, and the full-size image is not kept afterwards (its size is kept
+    in sizes). The crop is kept in the surface cache. If the image has already been read by decodeImage (with the
+    variant from cropVariant) it can be given
+    """
+    def getCrop(self, fileName, firstX, lastX, decoded = None):
+        key = (fileName, firstX, lastX)
+        crop = self.crops.get(key)
+        if crop is None:
+            self.misses += 1
+            if decoded is None:
+                decoded = decodeImage(fileName, cropVariant(firstX, lastX))
+            surfaces = surfaceCache.surfaces(decoded)
+            if surfaces is None:
+                image = (decoded.image or loadImage(fileName)).convert()#so the crop is blitted without converting
+                left = max(image.get_width() // 2 + firstX, 0)
+                right = min(image.get_width() // 2 + lastX, image.get_width())
+                surfaces = [image.subsurface(pygame.Rect(left, 0, right - left, image.get_height())).copy()]
+                surfaceCache.write(decoded, surfaces)
+            crop = surfaces[0]
+            self.sizes[fileName] = decoded.sourceSize
+            self.crops[key] = crop
+        else:
+            self.hits += 1
+        return crop
+    
+    """
+    Reset the hit and miss counters, e.g. at the start of a game
+    """
+    def resetCounters(self):
+        self.hits = 0
+        self.misses = 0
+
+imageCache = ImageCache()#the single image cache shared by the whole game
+
+"""
+The CollisionChecker class checks sprites for collisions in two phases. The broad phase compares the sprites'
+rects, which is cheap and rules out almost every pair (most obstacles are far off-screen or in another lane).
+Only pairs whose rects overlap go on to the narrow phase, the pixel-perfect mask check. The number of pairs
+tested and the number that needed the mask check are counted so the culling rate can be seen.
+"""
+class CollisionChecker(object):
+    """
+    Constructor for CollisionChecker
+    """
+    def __init__(self):
+        self.pairsTested = 0#pairs checked in the broad phase
+        self.pairsNarrowed = 0#pairs that survived the broad phase and needed a mask check
+        
+    """
+    Return True if the two sprites collide, checking their masks only if their rects overlap
+    """
+    def collide(self, left, right):
+        self.pairsTested += 1
+        if not left.rect.colliderect(right.rect):
+            return False
+        self.pairsNarrowed += 1
+        return pygame.sprite.collide_mask(left, right) is not None
+    
+    """
+    Return the slots of the obstacles in the given field that collide with the sprite
+    """
+    def collideField(self, sprite, field):
+        hits = []
+        rect = sprite.rect
+        self.pairsTested += field.count
+        for slot in field.overlapping(rect):
+            self.pairsNarrowed += 1
+            other = field.rect(slot)
+            if sprite.mask.overlap(field.masks[field.image[slot]], (other.x - rect.x, other.y - rect.y)) is not None:
+                hits.append(slot)
+        return hits
+    
+    """
+    Return the slots of the obstacles in the given field that collide with another obstacle in the field. Of each
+    colliding pair, only the obstacle in the later slot is returned
+    """
+    def collideWithin(self, field):
+        hits = set()
+        for first, second in field.candidatePairs():
+            self.pairsTested += 1
+            rect = field.rect(first)
+            otherRect = field.rect(second)
+            if not rect.colliderect(otherRect):
+                continue
+            self.pairsNarrowed += 1
+            if field.masks[field.image[first]].overlap(field.masks[field.image[second]], (otherRect.x - rect.x, otherRect.y - rect.y)) is not None:
+                hits.add(max(first, second))
+        return sorted(hits)
+    
+    """
+    Return the fraction of tested pairs that were ruled out by the broad phase
+    """
+    def cullingRate(self):
+        if self.pairsTested == 0:
+            return 0.0
+        return 1.0 - float(self.pairsNarrowed) / self.pairsTested
+    
+    """
+    Reset the pair counters, e.g. at the start of a game
+    """
+    def resetCounters(self):
+        self.pairsTested = 0
+        self.pairsNarrowed = 0
+
+collisionChecker = CollisionChecker()#the collision checker used by the game, kept so its counters can be read after a game
+
+"""
+Return where the given sprite should be drawn for a frame that falls the given fraction (alpha) of the way from its
+position before the last tick (previousRect) to its current position. Sprites that jumped are drawn where they are now.
+"""
+def interpolatedRect(sprite, alpha):
+    previous = getattr(sprite, "previousRect", None)
+    if previous is None or alpha >= 1.0:
+        return sprite.rect
+    dx = sprite.rect.x - previous.x
+    dy = sprite.rect.y - previous.y
+    if(abs(dx) > INTERPOLATION_LIMIT or abs(dy) > INTERPOLATION_LIMIT):
+        return sprite.rect
+    return pygame.Rect(previous.x + int(round(dx * alpha)), previous.y + int(round(dy * alpha)), sprite.rect.width, sprite.rect.height)
+
+"""
+Draw a game frame onto the given surface: the road, then the layers (obstacle fields and sprite layers) in order.
+Sprites are drawn the given fraction (alpha) of the way between their last two positions
+"""
+def drawScene(surface, road, layers, alpha = 1.0):
+    road.draw(surface, interpolatedRect(road, alpha))
+    for layer in layers:
+        for image, position in layer.drawList(alpha):
+            surface.blit(image, position)
+
+"""
+The FlipRenderer class draws each game frame the simple way: the road and every sprite are drawn in full
+and the complete screen is flipped to the display. It counts the pixels sent to the display each frame.
+
+Updating only the changed parts of the display (dirty rectangles) cannot help this game: the road scrolls under the
+whole screen every tick, so every pixel changes every frame. A dirty-rectangle renderer that scrolled the last frame
+and redrew only the uncovered strip still had to send the full 640x480 screen each frame, and was slower than a flip
+(0.94 against 0.84 ms per frame over 2000 headless frames), so it was removed.
+"""
+class FlipRenderer(object):
+    """
+    Constructor for FlipRenderer
+    """
+    def __init__(self):
+        self.pixelsPushed = 0#pixels sent to the display in the last frame
+        self.totalPixelsPushed = 0
+        self.frames = 0
+    
+    """
+    Get ready to draw a new game with the given road
+    """
+    def start(self, road):
+        self.road = road
+        self.pixelsPushed = 0
+        self.totalPixelsPushed = 0
+        self.frames = 0
+    
+    """
+    Draw the road, then the layers (obstacle fields and sprite layers) in order, and flip the display. Sprites are
+    drawn the given fraction (alpha) of the way between their last two positions
+    """
+    def draw(self, layers, alpha = 1.0):
+        drawScene(screen, self.road, layers, alpha)
+        pygame.display.flip()
+        self.countPixels(screen.get_width() * screen.get_height())
+    
+    """
+    Record the number of pixels sent to the display this frame
+    """
+    def countPixels(self, pixels):
+        self.pixelsPushed = pixels
+        self.totalPixelsPushed += pixels
+        self.frames += 1
+    
+    """
+    Return the average number of pixels sent to the display per frame
+    """
+    def averagePixelsPushed(self):
+        if self.frames == 0:
+            return 0.0
+        return float(self.totalPixelsPushed) / self.frames
+
+"""
+The NullRenderer class draws nothing, leaving the game loop to play the game only
+"""
+class NullRenderer(FlipRenderer):
+    def draw(self, layers, alpha = 1.0):
+        self.countPixels(0)
+
+#one renderer of each kind, kept so their pixel counts can be read after a game
+flipRenderer = FlipRenderer()
+nullRenderer = NullRenderer()
+
+"""
+Return the renderer chosen by RENDER_MODE
+"""
+def chosenRenderer():
+    if RENDER_MODE == "none":
+        return nullRenderer
+    return flipRenderer
+
+"""
+The NullSound class stands in for a pygame Sound when the game is headless. It accepts the same calls and does nothing.
+"""
+class NullSound(object):
+    def play(self, loops = 0, maxtime = 0, fade_ms = 0):
+        pass
+    def stop(self):
+        pass
+    def set_volume(self, volume):
+        pass
+
+"""
+Load the given sound file, or return a NullSound if the game is headless
+"""
+def loadSound(fileName):
+    if HEADLESS:
+        return NullSound()
+    if fileName in assetArchive:
+        return pygame.mixer.Sound(file = assetArchive.open(fileName))
+    return pygame.mixer.Sound(fileName)
+
+"""
+The AudioManager class plays every sound and piece of music in the game. Each sound is decoded only once, the first
+time the audio is used, however many screens and players come and go. Every category of sound has channels of its
+own, so, for example, a crash can never cut off the engine and a burst of pickups cannot use up the crash channels.
+A sound effect triggered again within SOUND_REPEAT_GAP milliseconds of the last time is skipped rather than stacked up.
+Music is loaded and started by a background thread, so a screen never waits for a music file to be read from disk.
+"""
+class AudioManager(object):
+    """
+    Constructor for AudioManager
+    """
+    def __init__(self):
+        self.sounds = None#by name, once the mixer is set up
+        self.channels = {}#by category, the reserved channels
+        self.nextChannel = {}#by category, the channel to take over if all of them are busy
+        self.lastPlayed = {}#by name, when the sound was last started
+        self.decodes = 0#sound files decoded
+        self.plays = 0
+        self.skipped = 0#repeat triggers that were skipped
+        self.musicRequests = None#music files waiting for the background thread
+        self.musicFile = None#the music being streamed from the asset archive, kept open while it plays
+    
+    """
+    Decode every sound that has not been decoded yet, setting up the mixer first if needed
+    """
+    def load(self):
+        self.setUp()
+        for name, fileName in SOUND_FILES.items():
+            if name not in self.sounds:
+                self.add(name, loadSound(fileName))
+    
+    """
+    Add a decoded sound (e.g. one decoded by loadAssets) under the given name, setting its volume
+    """
+    def add(self, name, sound):
+        sound.set_volume(SOUND_VOLUMES.get(name, SOUND_VOLUME))
+        self.sounds[name] = sound
+        self.decodes += 1
+    
+    """
+    Set up the mixer and reserve the channels for each category. Does nothing if already set up
+    """
+    def setUp(self):
+        if self.sounds is not None:
+            return
+        self.sounds = {}
+        if not pygame.mixer:
+            print("problem with sound")
+        elif not HEADLESS:
+            pygame.mixer.init()
+        
+        #reserve the first channels for the categories, so pygame never hands them out to anything else
+        if not HEADLESS and pygame.mixer.get_init():
+            reserved = sum(SOUND_CHANNELS.values())
+            if pygame.mixer.get_num_channels() < reserved:
+                pygame.mixer.set_num_channels(reserved)
+            pygame.mixer.set_reserved(reserved)
+            first = 0
+            for category in sorted(SOUND_CHANNELS):
+                self.channels[category] = [pygame.mixer.Channel(i) for i in range(first, first + SOUND_CHANNELS[category])]
+                self.nextChannel[category] = 0
+                first += SOUND_CHANNELS[category]
+    
+    """
+    Play the named sound on one of its category's channels, repeating it the given number of extra times (-1 for ever).
+    A sound played once is skipped if it was started less than SOUND_REPEAT_GAP milliseconds ago
+    """
+    def play(self, name, loops = 0):
+        self.load()
+        now = pygame.time.get_ticks()
+        if loops == 0 and name in self.lastPlayed and now - self.lastPlayed[name] < SOUND_REPEAT_GAP:
+            self.skipped += 1
+            return
+        self.lastPlayed[name] = now
+        self.plays += 1
+        
+        channels = self.channels.get(SOUND_CATEGORIES[name])
+        if not channels:
+            self.sounds[name].play(loops)#headless, or the mixer could not be set up
+            return
+        #use an idle channel if there is one, otherwise take over the channels in turn
+        for channel in channels:
+            if not channel.get_busy():
+                break
+        else:
+            category = SOUND_CATEGORIES[name]
+            channel = channels[self.nextChannel[category]]
+            self.nextChannel[category] = (self.nextChannel[category] + 1) % len(channels)
+        channel.play(self.sounds[name], loops)
+    
+    """
+    Stop the named sound wherever it is playing
+    """
+    def stop(self, name):
+        self.load()
+        self.sounds[name].stop()
+    
+    """
+    Stop every sound (but not the music)
+    """
+    def stopAll(self):
+        if not HEADLESS and pygame.mixer.get_init():
+            pygame.mixer.stop()
+    
+    """
+    Set the volume of the named sound, from 0.0 to 1.0
+    """
+    def setVolume(self, name, volume):
+        self.load()
+        self.sounds[name].set_volume(volume)
+    
+    """
+    Start the given music file looping, unless the game is headless. The file is loaded by the background thread, so
+    this returns straight away; if several pieces are asked for before it gets to them, only the last is played
+    """
+    def playMusic(self, fileName):
+        if HEADLESS:
+            return
+        if self.musicRequests is None:
+            self.musicRequests = queue.Queue()
+            loader = threading.Thread(target = self.loadMusic)
+            loader.daemon = True#do not keep the game running once the window is closed
+            loader.start()
+        self.musicRequests.put(fileName)
+    
+    """
+    Run by the background thread: load and start each music file asked for
+    """
+    def loadMusic(self):
+        while True:
+            fileName = self.musicRequests.get()
+            while not self.musicRequests.empty():
+                fileName = self.musicRequests.get()#skip straight to the latest request
+            try:
+                musicFile = assetArchive.open(fileName)
+                pygame.mixer.music.load(musicFile, fileName)
+                self.musicFile = musicFile#the mixer streams from it, so the previous one can only be let go now
+                pygame.mixer.music.play(-1, 0.0)#repeat
+                pygame.mixer.music.set_volume(MUSIC_VOLUME)
+            except pygame.error as error:
+                print("could not play %s: %s" % (fileName, error))
+
+audio = AudioManager()#the audio used by the game, kept so its counts can be read after a game
+
+"""
+The MouseInput class is the normal input source for the player: the position of the mouse
+"""
+class MouseInput(object):
+    def getPosition(self):
+        return pygame.mouse.get_pos()
+
+"""
+The ScriptedInput class is an input source that plays back a list of mouse y positions, one per frame, starting
+over when it reaches the end. It lets the game be driven without a mouse, e.g. when headless.
+"""
+class ScriptedInput(object):
+    """
+    Constructor for ScriptedInput
+    """
+    def __init__(self, yPositions):
+        self.yPositions = yPositions
+        self.frame = 0
+    
+    """
+    Return the next scripted mouse position
+    """
+    def getPosition(self):
+        y = self.yPositions[self.frame % len(self.yPositions)]
+        self.frame += 1
+        return (0, y)
+
+"""
+Return a ScriptedInput that drives through each lane in turn, staying in each one for the given number of frames
+"""
+def laneChangeInput(framesPerLane = FRAMES_PER_SECOND * 2):
+    yPositions = []
+    for lane in [LANE_3, LANE_4, LANE_2, LANE_1]:
+        yPositions += [int(lane * 1.1)] * framesPerLane#undo the player's reduced mouse sensitivity
+    return ScriptedInput(yPositions)
+
+mouseInput = MouseInput()#the input source used unless another is given
+
+#every random choice in the game comes from this generator, so a game can be played again exactly from its seed
+rng = random.Random()
+
+#a recording is this header (identifier, seed, number of frames, and 1 if any obstacles were vectorized or 0 if not)
+#followed by the mouse y position for each frame, stored as little-endian 16-bit integers. The obstacles make
+#different random choices with and without NumPy, so a recording can only be replayed the way it was made
+RECORDING_ID = b"CCR3"
+RECORDING_HEADER = struct.Struct("<4sIIB")
+
+"""
+Return a new random seed for a game
+"""
+def newSeed():
+    return random.randrange(1 << 32)
+
+"""
+The InputRecorder class passes along the positions from another input source, keeping the y position of every
+frame so the game can be saved and replayed exactly
+"""
+class InputRecorder(object):
+    """
+    Constructor for InputRecorder
+    """
+    def __init__(self, inputSource):
+        self.inputSource = inputSource
+        self.yPositions = array.array("h")
+    
+    """
+    Return the position from the input source, recording its y position
+    """
+    def getPosition(self):
+        x, y = self.inputSource.getPosition()
+        self.yPositions.append(y)
+        return (x, y)
+    
+    """
+    Save the recorded positions, along with the seed the game was played with, to the given file
+    """
+    def save(self, fileName, seed):
+        yPositions = array.array("h", self.yPositions)
+        if sys.byteorder == "big":
+            yPositions.byteswap()
+        recording = open(fileName, "wb")
+        try:
+            vectorized = VECTORIZED and max(ENEMY_COUNT, FLOTSAM_COUNT, NON_COLLIDE_COUNT) >= VECTORIZE_MIN_CAPACITY
+            recording.write(RECORDING_HEADER.pack(RECORDING_ID, seed, len(yPositions), vectorized))
+            recording.write(yPositions.tobytes())
+        finally:
+            recording.close()
+
+"""
+Load a recording saved by InputRecorder. Returns the seed, the list of mouse y positions (one per frame), and whether
+the obstacles were vectorized
+"""
+def loadRecording(fileName):
+    recording = open(fileName, "rb")
+    try:
+        data = recording.read()
+    finally:
+        recording.close()
+    recordingId = data[:len(RECORDING_ID)]
+    if recordingId != RECORDING_ID:
+        if recordingId[:3] == RECORDING_ID[:3]:
+            raise ValueError("%s was recorded by another version of Coin Collector" % fileName)
+        raise ValueError("%s is not a Coin Collector recording" % fileName)
+    recordingId, seed, frames, vectorized = RECORDING_HEADER.unpack_from(data)
+    if vectorized and numpy is None:
+        raise ValueError("%s was recorded with NumPy, which is needed to replay it" % fileName)
+    yPositions = array.array("h")
+    yPositions.frombytes(data[RECORDING_HEADER.size:RECORDING_HEADER.size + frames * yPositions.itemsize])
+    if sys.byteorder == "big":
+        yPositions.byteswap()
+    if len(yPositions) != frames:
+        raise ValueError("%s is incomplete" % fileName)
+    return seed, list(yPositions), bool(vectorized)
+
+"""
+The GameStats class records how the last game went, so it can be read after game() returns
+"""
+class GameStats(object):
+    """
+    Constructor for GameStats
+    """
+    def __init__(self):
+        self.seed = None#the seed the game's random choices came from
+        self.record(0, 0, HEALTH, 0, 0, 0)
+    
+    """
+    Record the results of a game
+    """
+    def record(self, frames, score, health, hitCar, hitFlotsam, hitPowerup):
+        self.frames = frames#the number of ticks the game lasted (one per frame when headless)
+        self.score = score
+        self.health = health#health left at the end of the game
+        self.hitCar = hitCar
+        self.hitFlotsam = hitFlotsam
+        self.hitPowerup = hitPowerup
+
+gameStats = GameStats()#the results of the last game played
+
+"""
+The ScoreStore class keeps the result of every game played in an SQLite database, so the high scores outlive the
+game. Results are written by a thread of its own: record() only puts the result in a queue, so the game never waits
+for the disk. The thread writes the results in batches, each batch in one transaction, committing as soon as
+SCORE_BATCH_SIZE results are waiting or SCORE_FLUSH_INTERVAL seconds after the first of them arrived. The database
+uses SQLite's write-ahead log, so reading the high scores never blocks the writer, and every commit is synced to the
+disk, so a crash or power cut loses at most the batch being gathered, never the results already committed. The
+scores are indexed, so the top scores are read straight from the front of the index however many games have been
+recorded.
+"""
+class ScoreStore(object):
+    """
+    Constructor for ScoreStore
+    """
+    def __init__(self):
+        self.fileName = None
+        self.results = queue.Queue()#results waiting to be written, then None to stop the writer
+        self.writer = None
+        self.reader = None#connection for reading the high scores, on the thread that reads them
+        self.recorded = 0#results written to the database
+        self.commits = 0
+        self.afterCommit = None#called by the writer thread after each batch is committed, e.g. to wake the leaderboard
+    
+    """
+    Open the given database, creating it if needed, and start the writer thread
+    """
+    def open(self, fileName):
+        self.fileName = fileName
+        connection = self.connect()
+        try:
+            connection.execute("CREATE TABLE IF NOT EXISTS games (id INTEGER PRIMARY KEY, played REAL, score INTEGER, frames INTEGER, seconds REAL, "
+                               "hitCar INTEGER, hitFlotsam INTEGER, hitPowerup INTEGER, seed INTEGER, synced INTEGER DEFAULT 0)")
+            if "synced" not in [column[1] for column in connection.execute("PRAGMA table_info(games)")]:
+                connection.execute("ALTER TABLE games ADD COLUMN synced INTEGER DEFAULT 0")#a database from before the leaderboard
+            connection.execute("CREATE INDEX IF NOT EXISTS gamesByScore ON games (score DESC)")
+            connection.execute("CREATE INDEX IF NOT EXISTS unsyncedGames ON games (id) WHERE synced = 0")#the leaderboard's outbox
+            connection.commit()
+        finally:
+            connection.close()
+        self.writer = threading.Thread(target = self.write)
+        self.writer.daemon = True#a game closed mid-batch only loses that batch
+        self.writer.start()
+    
+    """
+    Return a new connection to the database
+    """
+    def connect(self):
+        connection = sqlite3.connect(self.fileName)
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = FULL")#every commit reaches the disk; only the writer thread waits for it
+        return connection
+    
+    """
+    Queue the results of a game (the last one played, from gameStats, by default) to be written, taking the given
+    number of seconds. Returns at once; nothing is written on the calling thread
+    """
+    def record(self, seconds, stats = None):
+        if self.writer is None:
+            return
+        stats = stats or gameStats
+        self.results.put((time.time(), stats.score, stats.frames, seconds, stats.hitCar, stats.hitFlotsam, stats.hitPowerup, stats.seed))
+    
+    """
+    Run by the writer thread: write the results in batches until told to stop
+    """
+    def write(self):
+        connection = self.connect()
+        stopping = False
+        while not stopping:
+            batch = [self.results.get()]
+            deadline = time.time() + SCORE_FLUSH_INTERVAL
+            while batch[-1] is not None and len(batch) < SCORE_BATCH_SIZE:
+                try:
+                    batch.append(self.results.get(timeout = max(0.0, deadline - time.time())))
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                stopping = True
+                batch.pop()
+            if batch:
+                try:
+                    connection.executemany("INSERT INTO games (played, score, frames, seconds, hitCar, hitFlotsam, hitPowerup, seed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                    connection.commit()
+                    self.recorded += len(batch)
+                    self.commits += 1
+                    if self.afterCommit is not None:
+                        self.afterCommit()
+                except sqlite3.Error as error:
+                    connection.rollback()
+                    print("could not record %d scores: %s" % (len(batch), error))
+            for result in batch + [None] * stopping:
+                self.results.task_done()
+        connection.close()
+    
+    """
+    Wait until every result recorded so far has been written
+    """
+    def flush(self):
+        if self.writer is not None:
+            self.results.join()
+    
+    """
+    Return the given number of highest scoring games, highest first, as dictionaries of their results. Results still
+    waiting to be written are not included
+    """
+    def topScores(self, count = HIGH_SCORE_COUNT):
+        if self.fileName is None:
+            return []
+        if self.reader is None:
+            self.reader = self.connect()
+        cursor = self.reader.execute("SELECT played, score, frames, seconds, hitCar, hitFlotsam, hitPowerup, seed FROM games ORDER BY score DESC LIMIT ?", (count,))
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+    
+    """
+    Write every waiting result, stop the writer thread and close the database
+    """
+    def close(self):
+        if self.writer is not None:
+            self.results.put(None)
+            self.writer.join()
+            self.writer = None
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+scoreStore = ScoreStore()#every game played from the instructions screen, kept in SCORE_DATABASE
+
+"""
+The LeaderboardClient class sends the result of every game to the central leaderboard server and fetches the best
+scores from every kiosk, to show on the instructions screen. It runs an asyncio event loop on a thread of its own, so
+the game never waits for the network: the game only reads the scores last fetched, and wakes the client when a new
+result has been recorded.
+
+The outbox is the score database itself: every game the ScoreStore writes starts out not synced, and the client sends
+the games not yet synced in batches of up to LEADERBOARD_BATCH_SIZE, marking them synced once the server has accepted
+them. Games played while the server cannot be reached simply wait in the database, even if the game is closed, and
+are sent once it can. The server ignores games it already has (each is known by its kiosk and its id in the kiosk's
+database), so a batch can safely be sent again if the reply was lost. After a failure the client waits before trying
+again, twice as long each time up to LEADERBOARD_RETRY_MAX seconds, with some randomness so that kiosks that lost the
+server at the same time do not all come back at the same moment.
+"""
+class LeaderboardClient(object):
+    """
+    Constructor for LeaderboardClient
+    """
+    def __init__(self):
+        self.host = None
+        self.port = None
+        self.kiosk = None#the name this kiosk's games are sent under
+        self.fileName = None#the score database the outbox is read from
+        self.loop = None
+        self.thread = None
+        self.connection = None#to the score database, used only on the database thread
+        self.random = random.Random()#for the retry delays; not rng, so the game's random choices are not disturbed
+        self.scores = []#the best scores from every kiosk, as last fetched from the server
+        self.version = 0#counts changes to scores, so the instructions screen knows when to draw them again
+        self.online = False#whether the last attempt to reach the server worked
+        self.waiting = 0#games in the outbox
+        self.sent = 0#games accepted by the server
+        self.failures = 0#attempts to reach the server that failed
+    
+    """
+    Start syncing with the server at the given "host:port" address, sending games from the given score database
+    under the given kiosk name
+    """
+    def start(self, address, kiosk, fileName):
+        self.host, port = address.rsplit(":", 1)
+        self.port = int(port)
+        self.kiosk = kiosk
+        self.fileName = fileName
+        self.loop = asyncio.new_event_loop()
+        #made before the thread starts, so the client can be woken or stopped straight away
+        self.wakeEvent = asyncio.Event()
+        self.database = concurrent.futures.ThreadPoolExecutor(1)#SQLite calls block, so they are kept off the event loop
+        self.task = self.loop.create_task(self.sync())
+        self.thread = threading.Thread(target = self.run)
+        self.thread.daemon = True#never keep the game open waiting for the network
+        self.thread.start()
+    
+    """
+    Run by the client's thread: the event loop, until the client is stopped
+    """
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.task)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self.database.submit(self.closeDatabase)
+            self.database.shutdown()
+            self.loop.close()
+    
+    """
+    Sync as soon as possible, e.g. because a new result has been written. Safe to call from any thread
+    """
+    def wake(self):
+        if self.loop is not None and not self.loop.is_closed():
+            try:
+                self.loop.call_soon_threadsafe(self.wakeUp)
+            except RuntimeError:
+                pass#the loop closed in the meantime
+    
+    """
+    Run on the event loop: end the wait between syncs
+    """
+    def wakeUp(self):
+        self.wakeEvent.set()
+    
+    """
+    Stop syncing. Waits at most LEADERBOARD_TIMEOUT seconds for a sync that is under way
+    """
+    def stop(self):
+        if self.thread is None:
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.task.cancel)
+        except RuntimeError:
+            pass
+        self.thread.join(LEADERBOARD_TIMEOUT)
+        self.thread = None
+    
+    """
+    Sync with the server every LEADERBOARD_SYNC_INTERVAL seconds or when woken, backing off after failures
+    """
+    async def sync(self):
+        delay = 0.0
+        while True:
+            try:
+                await self.syncOnce()
+                self.online = True
+                delay = 0.0
+            except (OSError, asyncio.TimeoutError, ValueError, KeyError, TypeError, sqlite3.Error):
+                #the server could not be reached or sent a bad reply, or the database is busy; try again later
+                self.online = False
+                self.failures += 1
+                delay = min(max(delay * 2, LEADERBOARD_RETRY_MIN), LEADERBOARD_RETRY_MAX)
+                await asyncio.sleep(delay * self.random.uniform(0.5, 1.0))
+                continue
+            self.wakeEvent.clear()
+            try:
+                await asyncio.wait_for(self.wakeEvent.wait(), LEADERBOARD_SYNC_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+    
+    """
+    Connect to the server once: send every game in the outbox, then fetch the best scores
+    """
+    async def syncOnce(self):
+        self.waiting = await self.loop.run_in_executor(self.database, self.countUnsynced)
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), LEADERBOARD_TIMEOUT)
+        try:
+            while True:
+                games = await self.loop.run_in_executor(self.database, self.unsyncedGames)
+                if not games:
+                    break
+                reply = await leaderboardProtocol.request(reader, writer, {"type": "submit", "kiosk": self.kiosk, "games": games}, LEADERBOARD_TIMEOUT)
+                await self.loop.run_in_executor(self.database, self.markSynced, reply["accepted"])
+                self.sent += len(reply["accepted"])
+                if len(games) < LEADERBOARD_BATCH_SIZE:
+                    break
+            reply = await leaderboardProtocol.request(reader, writer, {"type": "top", "count": HIGH_SCORE_COUNT}, LEADERBOARD_TIMEOUT)
+            if reply["scores"] != self.scores:
+                self.scores = reply["scores"]
+                self.version += 1
+        finally:
+            writer.close()
+    
+    """
+    Run on the database thread: return the next batch of games from the outbox, oldest first
+    """
+    def unsyncedGames(self):
+        rows = self.connection.execute("SELECT id, played, score, frames, seconds, hitCar, hitFlotsam, hitPowerup FROM games WHERE synced = 0 ORDER BY id LIMIT ?",
+                                       (LEADERBOARD_BATCH_SIZE,)).fetchall()
+        names = ["id", "played", "score", "frames", "seconds", "hitCar", "hitFlotsam", "hitPowerup"]
+        return [dict(zip(names, row)) for row in rows]
+    
+    """
+    Run on the database thread: return the number of games in the outbox
+    """
+    def countUnsynced(self):
+        if self.connection is None:
+            self.connection = sqlite3.connect(self.fileName, timeout = LEADERBOARD_TIMEOUT)
+        return self.connection.execute("SELECT COUNT(*) FROM games WHERE synced = 0").fetchone()[0]
+    
+    """
+    Run on the database thread: take the games with the given ids out of the outbox
+    """
+    def markSynced(self, ids):
+        self.connection.executemany("UPDATE games SET synced = 1 WHERE id = ?", [(gameId,) for gameId in ids])
+        self.connection.commit()
+        self.waiting = max(0, self.waiting - len(ids))
+    
+    """
+    Run on the database thread when the client stops
+    """
+    def closeDatabase(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+leaderboard = LeaderboardClient()#syncs the score database with the central leaderboard, if one is set up
+
+"""
+The FrameProfiler class times each phase of every frame of the game loop (see PROFILE_PHASES). It keeps the times
+of recent frames for percentile statistics, and can also keep a trace of every frame to be saved for later analysis.
+A frame that plays several game ticks marks the tick phases once per tick; their times are added up for the frame.
+"""
+class FrameProfiler(object):
+    """
+    Constructor for FrameProfiler
+    """
+    def __init__(self, window = PROFILE_WINDOW):
+        self.window = window
+        self.tracing = False#whether to keep the times of every frame
+        self.reset()
+    
+    """
+    Forget all recorded times, e.g. at the start of a game
+    """
+    def reset(self):
+        self.times = {}#phase -> times of recent frames, in milliseconds
+        for phase in PROFILE_PHASES + ["total"]:
+            self.times[phase] = collections.deque(maxlen = self.window)
+        self.trace = []#one list of phase times per frame, if tracing
+        self.frameTimes = dict([(phase, 0.0) for phase in PROFILE_PHASES])#marks made outside a frame are not kept
+        self.frameStart = 0
+        self.lastMark = 0
+    
+    """
+    Start timing a new frame
+    """
+    def startFrame(self):
+        self.frameStart = self.lastMark = time.perf_counter()
+        self.frameTimes = dict([(phase, 0.0) for phase in PROFILE_PHASES])
+    
+    """
+    Record the time taken by the given phase, since the last phase (or the start of the frame) ended
+    """
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.frameTimes[phase] += (now - self.lastMark) * 1000.0
+        self.lastMark = now
+    
+    """
+    Finish timing the current frame
+    """
+    def endFrame(self):
+        total = (self.lastMark - self.frameStart) * 1000.0
+        for phase in PROFILE_PHASES:
+            self.times[phase].append(self.frameTimes[phase])
+        self.times["total"].append(total)
+        if self.tracing:
+            self.trace.append([self.frameTimes[phase] for phase in PROFILE_PHASES] + [total])
+    
+    """
+    Return the 50th, 95th and 99th percentile and the maximum time of the given phase over recent frames
+    """
+    def percentiles(self, phase):
+        times = sorted(self.times[phase])
+        if not times:
+            return (0.0, 0.0, 0.0, 0.0)
+        last = len(times) - 1
+        return (times[int(round(last * 0.50))], times[int(round(last * 0.95))], times[int(round(last * 0.99))], times[last])
+    
+    """
+    Return one line of statistics for each phase, and the whole frame
+    """
+    def summary(self):
+        lines = ["%-10s %7s %7s %7s %7s  (ms)" % ("phase", "p50", "p95", "p99", "max")]
+        for phase in PROFILE_PHASES + ["total"]:
+            lines.append("%-10s %7.2f %7.2f %7.2f %7.2f" % ((phase,) + self.percentiles(phase)))
+        return lines
+    
+    """
+    Save the traced frame times to the given file, as JSON if its name ends in .json and as CSV otherwise
+    """
+    def saveTrace(self, fileName):
+        columns = PROFILE_PHASES + ["total"]
+        traceFile = open(fileName, "w")
+        try:
+            if fileName.endswith(".json"):
+                json.dump({"units": "ms", "phases": columns, "frames": self.trace}, traceFile)
+            else:
+                traceFile.write("frame," + ",".join(columns) + "\n")
+                for frame in range(len(self.trace)):
+                    traceFile.write("%d,%s\n" % (frame, ",".join(["%.4f" % t for t in self.trace[frame]])))
+        finally:
+            traceFile.close()
+
+frameProfiler = FrameProfiler()#times the phases of the game loop
+
+"""
+The ProfilerOverlay class is a small sprite in the bottom-left corner of the screen that shows the frame
+profiler's statistics. It only renders new text every PROFILE_OVERLAY_INTERVAL frames to keep its own cost down.
+"""
+class ProfilerOverlay(pygame.sprite.Sprite):
+    """
+    Constructor for ProfilerOverlay
+    """
+    def __init__(self, profiler):
+        pygame.sprite.Sprite.__init__(self)
+        self.profiler = profiler
+        self.font = pygame.font.SysFont("Courier New", 14)
+        self.lineHeight = self.font.get_linesize()
+        self.frames = 0
+        self.render()
+    
+    """
+    Called once per frame, the update method renders the latest statistics every so often
+    """
+    def update(self):
+        self.frames += 1
+        if(self.frames % PROFILE_OVERLAY_INTERVAL == 0):
+            self.render()
+    
+    """
+    Render the statistics onto a translucent background
+    """
+    def render(self):
+        lines = self.profiler.summary()
+        width = max([self.font.size(line)[0] for line in lines]) + 8
+        self.image = pygame.Surface((width, self.lineHeight * len(lines) + 8), pygame.SRCALPHA)
+        self.image.fill((0, 0, 0, 160))
+        for i in range(len(lines)):
+            self.image.blit(self.font.render(lines[i], 1, (255, 255, 0)), (4, 4 + i * self.lineHeight))
+        self.rect = self.image.get_rect()
+        self.rect.bottomleft = (0, screen.get_height())
+
 """
 The Player class defines all of the properties of the player, such as the image, sounds, etc.
 This is the sprite the player will move to avoid obstacles and collect the objectives.
 """
 class Player(pygame.sprite.Sprite):
     """
-    Constructor for Player Class   
+    Constructor for Player Class. The inputSource steers the car, and is the mouse unless another is given
     """
-    def __init__(self):
+    def __init__(self, inputSource = None):
         pygame.sprite.Sprite.__init__(self)
-        #set the sprite's image to the playerCar.gif file
-        self.image = pygame.image.load("playerCar.gif")
-        self.image = self.image.convert()
+        self.inputSource = inputSource or mouseInput
+        #build the table of animation frames once; the car only ever swaps between these surfaces
+        fadedCar = imageCache.get("playerCar.gif").copy()
+        fadedCar.set_alpha(FADED_ALPHA)
+        self.frames = [None, None, None]
+        self.frames[PLAYER_NORMAL] = imageCache.get("playerCar.gif")
+        self.frames[PLAYER_BLANK] = imageCache.get("blankCar.gif")
+        self.frames[PLAYER_FADED] = fadedCar
+        
+        #the collision mask for each frame. The faded car has the same shape as the normal car
+        self.frameMasks = [None, None, None]
+        self.frameMasks[PLAYER_NORMAL] = imageCache.getMask("playerCar.gif")
+        self.frameMasks[PLAYER_BLANK] = imageCache.getMask("blankCar.gif")
+        self.frameMasks[PLAYER_FADED] = self.frameMasks[PLAYER_NORMAL]
+        
+        #set the sprite's image to the normal car frame
+        self.setFrame(PLAYER_NORMAL)
         self.rect = self.image.get_rect()
         
         #the following is for the invulnerability state which occurs when the player hits a car/object or collects as a star
@@ -74,37 +1530,19 @@ class Player(pygame.sprite.Sprite):
         self.invulnerableElapsed = 0 #current time invulnerable, increments when invulnerable is active
         
         #keep track of how many collisions there are for the player
-        self.hitCar = 0
-        self.hitFlotsam = 0
-        self.hitPowerup = 0
-        
-        #setup in-game sound setup
-        if not pygame.mixer:
-            print("problem with sound")
-        else:
-            pygame.mixer.init()
-            
-            self.sndEngine = pygame.mixer.Sound("engine.ogg")
-            self.sndEngine.play(-1)
-            self.sndCrash = pygame.mixer.Sound("crash.ogg")
-            self.sndHit = pygame.mixer.Sound("hit1.ogg")
-            self.sndFix = pygame.mixer.Sound("fix.ogg")
-            self.sndCoin = pygame.mixer.Sound("coin.ogg")
-            self.sndInvulnerable = pygame.mixer.Sound("Invulnerable.ogg")
-            
-            #set the volume and make adjustments from default for given sounds if required
-            self.sndEngine.set_volume(SOUND_VOLUME)
-            self.sndCrash.set_volume(SOUND_VOLUME + 0.5)
-            self.sndHit.set_volume(SOUND_VOLUME)
-            self.sndFix.set_volume(SOUND_VOLUME)
-            self.sndCoin.set_volume(SOUND_VOLUME)
-            self.sndInvulnerable.set_volume(SOUND_VOLUME)
+        self.hitCar = 0
+        self.hitFlotsam = 0
+        self.hitPowerup = 0
+        
+        #start the engine sound
+        audio.setVolume("engine", SOUND_VOLUME)
+        audio.play("engine", -1)
    
     """
     The update method is called once per frame, which updates the position and sprite of the player object        
     """
     def update(self):
-        mousex, mousey = pygame.mouse.get_pos() #get the mouse position and translte it to the screen
+        mousex, mousey = self.inputSource.getPosition() #get the mouse position and translte it to the screen
         
         #reduce the sensitivity by 10%
         mousex = mousex / 1.1
@@ -122,38 +1560,91 @@ class Player(pygame.sprite.Sprite):
         #if the player is invulnerable, flash the car image to show this and increased time elapsed as invulnerable
         if(self.invulnerable and self.invulnerableElapsed < self.invulnerableDuration):
             self.invulnerableElapsed += 1
-            if(self.invulnerableElapsed % 2 == 0):
-                self.image = pygame.image.load("playerCar.gif")
-            else:
-                self.image = pygame.image.load("blankCar.gif")
+            step = (self.invulnerableElapsed - 1) // INVULNERABLE_FRAME_LENGTH
+            self.setFrame(INVULNERABLE_ANIMATION[step % len(INVULNERABLE_ANIMATION)])
 
         #if the invulnerability state has ended (comparing elapsed = duration
         elif(self.invulnerable and self.invulnerableElapsed >= self.invulnerableDuration):
             #revert to default values after player has been invulnerable for the complete duration
-            self.image = pygame.image.load("playerCar.gif")
+            self.setFrame(PLAYER_NORMAL)
             self.invulnerableElapsed = 0
             self.invulnerableDuration = 30 
             self.invulnerable = False
 
+    """
+    Show the given frame from the frame table, along with its collision mask
+    """
+    def setFrame(self, frame):
+        self.image = self.frames[frame]
+        self.mask = self.frameMasks[frame]
+
+"""
+The SpawnScheduler class keeps sprites that are waiting to come onto the screen out of the game until they are
+needed. A sprite placed far off the screen (a power-up can be 30000 pixels away) would otherwise be moved and
+checked for collisions every tick for the hundreds of ticks it takes to scroll into view. Instead it is scheduled:
+it works out how many ticks until it comes into view, takes itself out of its group, and is put in a priority
+queue keyed by the tick it is due. Each tick, only the sprites that are due are taken from the front of the queue
+and activated, so waiting sprites cost nothing.
+"""
+class SpawnScheduler(object):
+    """
+    Constructor for SpawnScheduler
+    """
+    def __init__(self):
+        self.reset()
+    
+    """
+    Empty the queue and start counting ticks from zero, e.g. at the start of a game
+    """
+    def reset(self):
+        self.queue = []#(tick due, order scheduled, sprite)
+        self.order = itertools.count()#keeps sprites due on the same tick in the order they were scheduled
+        self.tick = 0#the number of update phases started
+        self.activations = 0
+    
+    """
+    Activate the given sprite once it has missed the given number of moves. The tick it is due is counted from the
+    next update phase if it has not started yet, or the one after it if it is under way
+    """
+    def schedule(self, ticks, sprite):
+        heapq.heappush(self.queue, (self.tick + ticks + 1, next(self.order), sprite))
+    
+    """
+    Start a tick's update phase, activating every sprite that is due. Called before the sprites are updated
+    """
+    def update(self):
+        self.tick += 1
+        while self.queue and self.queue[0][0] <= self.tick:
+            heapq.heappop(self.queue)[2].activate()
+            self.activations += 1
+    
+    """
+    Return the number of sprites waiting
+    """
+    def __len__(self):
+        return len(self.queue)
+
+spawnScheduler = SpawnScheduler()#the scheduler used by the game, kept so its counts can be read after a game
+
 """
-The Environment class defines the sprites that are, to the player's eye, stationary on the road. This includes
-flotsam such as mufflers and pylons, and non-collision objects such as cracks on the road and tiremarks.
+The Environment class defines the single sprites that are, to the player's eye, stationary on the road: the coin
+and the repair and star power-ups. Flotsam and non-collision objects such as cracks on the road are kept in
+an EnvironmentField instead, as there can be any number of them.
+
+If a group is given, the sprite is only in it while it is on the screen or about to come onto it: when it resets
+to somewhere further off the screen it waits in the spawnScheduler instead, and is put back in the group (where it
+would have been by then) as it comes into view.
 """
 class Environment(pygame.sprite.Sprite):
     """
     Constructor for Environment
     """
-    def __init__(self, startx, endx, imageStr):
+    def __init__(self, startx, endx, imageStr, group = None):
         pygame.sprite.Sprite.__init__(self)
+        self.group = group#the group the sprite is in while it is active
         self.imageStr = imageStr #set the imageStr variable from the parameters list and hold it for later use
-        self.image = pygame.image.load("barrel.gif")#instantiate the image
-        #if the image of the object requires randomization, check for those specific strings
-        if(self.imageStr == "flotsam" or self.imageStr == "nonCollide"):
-            self.randomEnvironmentImages()
-        else:
-            #if the string is looking for one specific image, convert to an image
-            self.image = pygame.image.load(imageStr)
-        self.image = self.image.convert()
+        self.image = imageCache.get(imageStr)
+        self.mask = imageCache.getMask(imageStr)
         self.rect = self.image.get_rect()
         
         #set the speed of the objects crossing the screen equal to the scroll speed. These items do not move in the eye's of the player
@@ -166,7 +1657,7 @@ class Environment(pygame.sprite.Sprite):
         self.reset()
     
     """
-    The update method is called once per frame, which updates the position and sprite of the environment objects        
+    The update method is called once per frame, which updates the position of the environment object
     """
     def update(self):
         self.rect.centerx -= self.dx#update the position through subtracting by the speed variable
@@ -175,89 +1666,453 @@ class Environment(pygame.sprite.Sprite):
             self.reset()
     
     """
-    The reset method will reset the position of the sprite, as well as the image if it needs to be randomized
+    The reset method will reset the position of the sprite. If it has a group, it waits in the spawnScheduler until
+    it is about to come onto the screen
     """
     def reset(self):
-        #reset the position
-        self.rect.centerx = random.randrange(self.startx, self.endx)
-        self.rect.centery = random.randrange(75, screen.get_height() - 75)
-        #randomize the image for environment objects that require it
-        if(self.imageStr == "flotsam" or self.imageStr == "nonCollide"):
-            self.randomEnvironmentImages()
-                    
+        self.rect.centerx = rng.randrange(self.startx, self.endx)
+        self.rect.centery = rng.randrange(75, screen.get_height() - 75)
+        if self.group is not None:
+            #skip the moves that would leave the sprite still entirely off the screen
+            ticks = max(0, (self.rect.left - screen.get_width()) // self.dx)
+            self.rect.centerx -= ticks * self.dx
+            self.kill()
+            spawnScheduler.schedule(ticks, self)
+    
+    """
+    Put the sprite back in its group, as it is about to come onto the screen
+    """
+    def activate(self):
+        self.previousRect = self.rect.copy()
+        self.add(self.group)
+
+"""
+The ObstacleField class holds every obstacle of one kind (enemy cars, flotsam, or marks on the road). Rather than
+one sprite object per obstacle, the centre position, speed, size and image of each obstacle are kept side by side
+in arrays, so the whole field is moved in one pass. The arrays are made once, with room for a fixed number of
+obstacles (the capacity), and work as a pool: slots 0 to count - 1 are in use, spawn takes the next free slot
+and release gives one back. An obstacle that leaves the screen is not replaced but reset, reusing its slot.
+As with the old sprites, each obstacle keeps the size of the image it was first given.
+
+If NumPy is installed and the field has room for at least VECTORIZE_MIN_CAPACITY obstacles, the arrays are NumPy
+arrays and the field is vectorized: each tick every obstacle is moved with one subtraction, the obstacles to reset are
+found with one comparison, and their new positions are drawn from the field's random generator all at once.
+Otherwise the standard library's arrays are used, one obstacle at a time. Each field has a random generator of its
+own, seeded from rng, so a game is still played again exactly from its seed; choices made for one obstacle at a time
+always come from a standard library generator, as drawing single numbers from NumPy's is slow.
+
+Only the fields of each kind (EnvironmentField and EnemyField) are made. Each defines reset(slot), which puts the
+obstacle in the given slot back at the start with new random choices, and resetSlots(slots), which resets the
+obstacles in the given array of slots all at once (used by vectorized fields only).
+"""
+class ObstacleField(object):
     """
-    The following method will randomize between images for objects that require image randomization
-    by checking the imageStr for a specific string that represents image randomizations
+    Constructor for ObstacleField
     """
-    def randomEnvironmentImages(self):
-        if(self.imageStr == "flotsam"):
-            images = ["barrel.gif", "crate.gif", "muffler.gif", "tire.gif", "pylon.gif"]
-        elif(self.imageStr == "nonCollide"):
-            images = ["crack1.gif", "crack2.gif", "crack3.gif", "crack4.gif", "crack5.gif", "crack6.gif", "crack7.gif", "leaf1.gif", "grass1.gif", "leaf2.gif", "tiremarks.gif"]            
-        image = random.randrange(0, len(images))
-        self.image = pygame.image.load(images[image])
+    def __init__(self, capacity, imageNames):
+        self.capacity = capacity
+        self.count = 0#the number of slots in use
+        self.images = [imageCache.get(fileName) for fileName in imageNames]
+        self.masks = [imageCache.getMask(fileName) for fileName in imageNames]
+        self.vectorized = VECTORIZED and capacity >= VECTORIZE_MIN_CAPACITY
+        
+        seed = rng.randrange(1 << 32)
+        self.slotRandom = random.Random(seed)#for choices made one obstacle at a time, which NumPy is slow to make
+        if self.vectorized:
+            self.random = numpy.random.default_rng(seed)
+            self.imageWidths = numpy.array([image.get_width() for image in self.images])
+        else:
+            self.random = random.Random(seed)
+            self.imageWidths = [image.get_width() for image in self.images]
         
- 
+        #one entry per slot
+        self.columns = []#every array with one entry per slot
+        self.x = self.newArray()#centre x
+        self.y = self.newArray()#centre y
+        self.dx = self.newArray()#speed to the left, in pixels per tick
+        self.width = self.newArray()
+        self.height = self.newArray()
+        self.image = self.newArray()#index into images and masks
+        self.previousX = self.newArray()#centre before the last tick, for drawing in between ticks
+        self.previousY = self.newArray()
+    
+    """
+    Return a new array of integers with one entry per slot
+    """
+    def newArray(self):
+        if self.vectorized:
+            values = numpy.zeros(self.capacity, numpy.int32)
+        else:
+            values = array.array("i", [0]) * self.capacity
+        self.columns.append(values)
+        return values
+    
+    """
+    Return a random integer from low up to (but not including) high from the field's random generator
+    """
+    def randomInteger(self, low, high):
+        return self.slotRandom.randrange(low, high)
+    
+    """
+    Place a new obstacle in the next free slot and return the slot, or None if the field is full
+    """
+    def spawn(self):
+        if self.count == self.capacity:
+            return None
+        slot = self.count
+        self.count += 1
+        self.place(slot)
+        self.previousX[slot] = self.x[slot]
+        self.previousY[slot] = self.y[slot]
+        return slot
+    
+    """
+    Remove the obstacle in the given slot. The last obstacle in use is moved into its slot
+    """
+    def release(self, slot):
+        last = self.count - 1
+        for values in self.columns:
+            values[slot] = values[last]
+        self.count = last
+    
+    """
+    Give a newly spawned obstacle its size and starting position. By default it takes the size of its first image
+    """
+    def place(self, slot):
+        self.reset(slot)
+        self.setSize(slot, self.image[slot])
+    
+    """
+    Set the size of the obstacle in the given slot to the size of the given image
+    """
+    def setSize(self, slot, image):
+        width, height = self.images[image].get_size()
+        self.width[slot] = width
+        self.height[slot] = height
+    
+    """
+    Remember where every obstacle is before a tick, for drawing frames in between ticks
+    """
+    def rememberPositions(self):
+        self.previousX[:] = self.x
+        self.previousY[:] = self.y
+    
+    """
+    The update method is called once per tick. Every obstacle is moved to the left by its speed, then those that
+    went beyond the reset point are reset (in slot order, so the random choices are always made in the same order)
+    """
+    def update(self):
+        count = self.count
+        if self.vectorized:
+            x = self.x[:count]#a view, so this moves the obstacles in place
+            x -= self.dx[:count]
+            slots = numpy.flatnonzero(x < RESET_POINT)
+            if len(slots) > 0:
+                self.resetSlots(slots)
+        else:
+            self.x[:count] = array.array("i", map(int.__sub__, self.x[:count], self.dx[:count]))
+            for slot in [slot for slot, x in enumerate(self.x[:count]) if x < RESET_POINT]:
+                self.reset(slot)
+    
+    """
+    Return the rect of the obstacle in the given slot
+    """
+    def rect(self, slot):
+        width = int(self.width[slot])
+        height = int(self.height[slot])
+        return pygame.Rect(int(self.x[slot]) - width // 2, int(self.y[slot]) - height // 2, width, height)
+    
+    """
+    Return the slots of the obstacles whose rects overlap the given rect
+    """
+    def overlapping(self, rect):
+        count = self.count
+        if self.vectorized:
+            width = self.width[:count]
+            height = self.height[:count]
+            left = self.x[:count] - width // 2
+            top = self.y[:count] - height // 2
+            return numpy.flatnonzero((left < rect.right) & (left + width > rect.x) & (top < rect.bottom) & (top + height > rect.y)).tolist()
+        slots = []
+        for slot in range(count):
+            width = self.width[slot]
+            height = self.height[slot]
+            left = self.x[slot] - width // 2
+            top = self.y[slot] - height // 2
+            if left < rect.right and left + width > rect.x and top < rect.bottom and top + height > rect.y:
+                slots.append(slot)
+        return slots
+    
+    """
+    Return the pairs of slots (earlier slot first) whose obstacles could be colliding with each other. By default
+    this is every pair
+    """
+    def candidatePairs(self):
+        return [(first, second) for second in range(self.count) for first in range(second)]
+    
+    """
+    Return the image and position of each obstacle on the screen, drawn the given fraction (alpha) of the way between
+    its last two positions. Obstacles that jumped are drawn where they are now, as interpolatedRect does for sprites.
+    Positions are only worked out one by one for the obstacles that are on the screen
+    """
+    def drawList(self, alpha = 1.0):
+        screenWidth = screen.get_width()
+        count = self.count
+        if self.vectorized:
+            x = self.x[:count]
+            y = self.y[:count]
+            if alpha < 1.0:
+                previousX = self.previousX[:count]
+                previousY = self.previousY[:count]
+                dx = x - previousX
+                dy = y - previousY
+                smooth = (numpy.abs(dx) <= INTERPOLATION_LIMIT) & (numpy.abs(dy) <= INTERPOLATION_LIMIT)
+                x = numpy.where(smooth, previousX + numpy.round(dx * alpha).astype(numpy.int32), x)
+                y = numpy.where(smooth, previousY + numpy.round(dy * alpha).astype(numpy.int32), y)
+            left = x - self.width[:count] // 2
+            image = self.image[:count]
+            visible = numpy.flatnonzero((left < screenWidth) & (left + self.imageWidths[image] > 0))
+            top = y[visible] - self.height[:count][visible] // 2
+            return [(self.images[i], (l, t)) for i, l, t in zip(image[visible].tolist(), left[visible].tolist(), top.tolist())]
+        drawList = []
+        for slot in range(count):
+            x = self.x[slot]
+            y = self.y[slot]
+            if alpha < 1.0:
+                dx = x - self.previousX[slot]
+                dy = y - self.previousY[slot]
+                if(abs(dx) <= INTERPOLATION_LIMIT and abs(dy) <= INTERPOLATION_LIMIT):
+                    x = self.previousX[slot] + int(round(dx * alpha))
+                    y = self.previousY[slot] + int(round(dy * alpha))
+            left = x - self.width[slot] // 2
+            image = self.image[slot]
+            if left < screenWidth and left + self.imageWidths[image] > 0:
+                drawList.append((self.images[image], (left, y - self.height[slot] // 2)))
+        return drawList
+
 """
-The Enemy class defines the enemy sprites. In this game, it is jst the cars that move at various speeds
-across the screen. There are 4 fixed lanes defined that they will appear on and follow x-directionally, as per the background. 
-"""       
-class Enemy(pygame.sprite.Sprite):
+The EnvironmentField class holds obstacles that are, to the player's eye, stationary on the road, each showing one
+of the given images at random: flotsam such as mufflers and pylons, or non-collision objects such as cracks on the
+road and tiremarks.
+"""
+class EnvironmentField(ObstacleField):
     """
-    Constructor for Enemy
+    Constructor for EnvironmentField
     """
-    def __init__(self):
-        pygame.sprite.Sprite.__init__(self)
-        self.image = pygame.image.load("enemyCar1.gif")
-        self.image = self.image.convert()
-        self.rect = self.image.get_rect()
-        self.reset()
+    def __init__(self, capacity, startx, endx, imageNames):
+        ObstacleField.__init__(self, capacity, imageNames)
+        #the range of x positions obstacles are placed at when they reset
+        self.startx = startx
+        self.endx = endx
+    
+    """
+    Give a newly spawned obstacle the size of a randomly chosen image, then reset it
+    """
+    def place(self, slot):
+        self.setSize(slot, self.randomInteger(0, len(self.images)))
+        self.dx[slot] = SCROLL_SPEED#these do not move in the eyes of the player
+        self.reset(slot)
+    
+    """
+    The reset method will reset the position of the obstacle and randomize its image
+    """
+    def reset(self, slot):
+        self.x[slot] = self.randomInteger(self.startx, self.endx)
+        self.y[slot] = self.randomInteger(75, screen.get_height() - 75)
+        self.image[slot] = self.randomInteger(0, len(self.images))
+    
+    """
+    Reset the obstacles in the given array of slots all at once
+    """
+    def resetSlots(self, slots):
+        count = len(slots)
+        self.x[slots] = self.random.integers(self.startx, self.endx, count)
+        self.y[slots] = self.random.integers(75, screen.get_height() - 75, count)
+        self.image[slots] = self.random.integers(0, len(self.images), count)
 
+"""
+The EnemyField class holds the enemy cars. In this game, these are the cars that move at various speeds across the
+screen. There are 4 fixed lanes defined that they will appear on and follow x-directionally, as per the background.
+
+Since every car is the same size and the lanes are further apart than a car is tall, cars can only touch the player
+in the lanes the player overlaps, and can only touch each other within a lane. The cars are indexed by lane, each
+lane's cars sorted by x, so finding the cars near the player is a binary search in one or two lanes, and only cars
+next to each other in a lane have to be checked against each other. The index is rebuilt when it is next needed
+after the cars move or reset. With fewer than LANE_INDEX_MIN_COUNT cars (as in a normal game) building the index
+costs more than it saves, so every car and every pair is simply tested instead.
+"""
+class EnemyField(ObstacleField):
+    """
+    Constructor for EnemyField
+    """
+    def __init__(self, capacity):
+        ObstacleField.__init__(self, capacity, ONCOMING_ENEMY_IMAGES + WITH_ENEMY_IMAGES)
+        self.lane = self.newArray()#index into LANES
+        #every car has the size of the first 'with' car image
+        self.carWidth, self.carHeight = self.images[len(ONCOMING_ENEMY_IMAGES)].get_size()
+        self.index = None#for each lane, the slots of its cars and their x positions, sorted by x
+    
+    """
+    Give a newly spawned car its size (that of the first 'with' car image), then reset it
+    """
+    def place(self, slot):
+        self.setSize(slot, len(ONCOMING_ENEMY_IMAGES))
+        self.reset(slot)
+    
+    """
+    Remove the car in the given slot
+    """
+    def release(self, slot):
+        ObstacleField.release(self, slot)
+        self.index = None
+    
     """
-    The update method is called once per frame, which updates the position and sprite of the enemy objects        
+    Move the cars, resetting those that went off the screen
     """
     def update(self):
-        self.rect.centerx = self.rect.centerx - self.dx
-        if self.rect.centerx < -50:#if the enemy is off the screen, reset the image
-            self.reset()
+        ObstacleField.update(self)
+        self.index = None
     
     """
-    The reset method will reset the position of the sprite as well as randomizing the lanes
-    and colours of the cars. Oncoming cars must be defined differently than other cars as there are different
-    speeds and images used.
+    Return the lane index, building it first if the cars have moved since it was last built
     """
-    def reset(self):
+    def laneIndex(self):
+        if self.index is None:
+            count = self.count
+            self.index = []
+            if self.vectorized:
+                x = self.x[:count]
+                order = numpy.lexsort((x, self.lane[:count]))#by lane, then by x
+                bounds = numpy.searchsorted(self.lane[:count][order], numpy.arange(len(LANES) + 1))
+                for lane in range(len(LANES)):
+                    slots = order[bounds[lane]:bounds[lane + 1]]
+                    self.index.append((slots, x[slots]))
+            else:
+                lanes = [[] for lane in LANES]
+                for slot in range(count):
+                    lanes[self.lane[slot]].append(slot)
+                for slots in lanes:
+                    slots.sort(key = self.x.__getitem__)
+                    self.index.append((slots, [self.x[slot] for slot in slots]))
+        return self.index
+    
+    """
+    Return the slots of the cars whose rects overlap the given rect, searching only the lanes the rect overlaps
+    """
+    def overlapping(self, rect):
+        if self.count < LANE_INDEX_MIN_COUNT:
+            return ObstacleField.overlapping(self, rect)
+        found = []
+        for lane, (slots, x) in enumerate(self.laneIndex()):
+            top = LANES[lane] - self.carHeight // 2
+            if top < rect.bottom and top + self.carHeight > rect.y:
+                #the cars whose left edge is before the rect's right edge and whose right edge is after its left edge
+                low = rect.x - self.carWidth + self.carWidth // 2
+                high = rect.right + self.carWidth // 2
+                if self.vectorized:
+                    found.extend(slots[numpy.searchsorted(x, low, "right"):numpy.searchsorted(x, high, "left")].tolist())
+                else:
+                    found.extend(slots[bisect.bisect_right(x, low):bisect.bisect_left(x, high)])
+        return sorted(found)
+    
+    """
+    Return the pairs of slots (earlier slot first) of cars that are next to each other in a lane and close enough to
+    be touching
+    """
+    def candidatePairs(self):
+        if self.count < LANE_INDEX_MIN_COUNT:
+            return ObstacleField.candidatePairs(self)
+        pairs = []
+        for slots, x in self.laneIndex():
+            if self.vectorized:
+                close = numpy.flatnonzero(numpy.diff(x) < self.carWidth)
+                neighbours = zip(slots[close].tolist(), slots[close + 1].tolist())
+            else:
+                neighbours = [(slots[i - 1], slots[i]) for i in range(1, len(slots)) if x[i] - x[i - 1] < self.carWidth]
+            pairs.extend([(min(pair), max(pair)) for pair in neighbours])
+        return pairs
+    
+    """
+    The reset method will reset the position of the car as well as randomizing its lane and colour. Oncoming cars
+    must be defined differently than other cars as there are different speeds and images used.
+    """
+    def reset(self, slot):
         #randomize a lane
-        lane = random.randrange(1, 5)
+        lane = self.randomInteger(1, 5)
         #randomize an image
-        image = random.randrange(1, 3)
-        self.dx = random.randrange(13, 15)
-        self.rect.centerx = 750
+        image = self.randomInteger(1, 3)
+        self.dx[slot] = self.randomInteger(13, 15)
+        self.x[slot] = ENEMY_START_X
+        if ENEMY_SPAWN_SPREAD > 0:#spread the cars out along the road rather than all starting at the same place
+            self.x[slot] += self.randomInteger(0, ENEMY_SPAWN_SPREAD)
+        self.lane[slot] = lane - 1
+        self.y[slot] = LANES[lane - 1]
+        self.index = None
         if(lane == 1 or lane == 2): #Oncoming lanes
-            self.dx += SCROLL_SPEED    
-            if(lane == 1):
-                self.rect.centery = LANE_1
-            elif(lane == 2):          
-                self.rect.centery = LANE_2
+            self.dx[slot] += SCROLL_SPEED
             #set image to an oncoming car image
-            if(image == 1):
-                self.image = pygame.image.load("oncomingEnemyCar1.gif")
-            elif(image == 2):
-                self.image = pygame.image.load("oncomingEnemyCar2.gif")
-                
-        if(lane == 3 or lane == 4):#with lanes  
-            if(lane == 3):
-                self.rect.centery = LANE_3
-            elif(lane == 4):          
-                self.rect.centery = LANE_4
+            self.image[slot] = image - 1
+        else:#with lanes
             #set image to a with car image
-            if(image == 1):
-                self.image = pygame.image.load("enemyCar1.gif")
-            elif(image == 2):
-                self.image = pygame.image.load("enemyCar2.gif")
+            self.image[slot] = len(ONCOMING_ENEMY_IMAGES) + image - 1
+    
+    """
+    Reset the cars in the given array of slots all at once
+    """
+    def resetSlots(self, slots):
+        count = len(slots)
+        lanes = self.random.integers(1, 5, count)
+        images = self.random.integers(1, 3, count)
+        dx = self.random.integers(13, 15, count)
+        x = numpy.full(count, ENEMY_START_X)
+        if ENEMY_SPAWN_SPREAD > 0:
+            x += self.random.integers(0, ENEMY_SPAWN_SPREAD, count)
+        oncoming = lanes <= 2
+        self.dx[slots] = dx + oncoming * SCROLL_SPEED
+        self.x[slots] = x
+        self.lane[slots] = lanes - 1
+        self.y[slots] = numpy.array(LANES)[lanes - 1]
+        self.index = None
+        self.image[slots] = numpy.where(oncoming, images - 1, len(ONCOMING_ENEMY_IMAGES) + images - 1)
+
+"""
+The SpriteLayer class lets a group of sprites be drawn by the renderers in the same way as an obstacle field
+"""
+class SpriteLayer(object):
+    """
+    Constructor for SpriteLayer
+    """
+    def __init__(self, group):
+        self.group = group
+    
+    """
+    Return the image and position of each sprite in the group, drawn the given fraction (alpha) of the way between
+    its last two positions
+    """
+    def drawList(self, alpha = 1.0):
+        return [(sprite.image, interpolatedRect(sprite, alpha)) for sprite in self.group]
+
+"""
+Return the image the road is drawn from: the part of the background between the road's start and reset positions.
+The background is decoded here unless an already decoded copy is given
+"""
+def roadImage(decoded = None):
+    return imageCache.getCrop("background.png", *(roadArea() + (decoded,)))
 
 """
-The Road class defines the background image (the road).
+Return the first x and last x the road's background is cropped to
+"""
+def roadArea():
+    return (-ROAD_START_X, screen.get_width() - ROAD_RESET_X)
+
+"""
+The Road class defines the background image (the road). The background is converted to the screen's format when
+it is loaded, so drawing it is one blit that SDL clips to the screen. Parts of the background that never scroll onto
+the screen are cropped off and not kept at all.
+
+Cutting the background into screen-wide tiles was tried, to blit only the tiles on the screen, but it was slower:
+SDL already clips a blit to the screen, so the extra blit where two tiles meet was pure cost, and it saved no memory
+over the crop.
 """       
 class Road(pygame.sprite.Sprite):
     """
@@ -265,8 +2120,11 @@ class Road(pygame.sprite.Sprite):
     """
     def __init__(self):
         pygame.sprite.Sprite.__init__(self)
-        self.image = pygame.image.load("background.png")
-        self.rect = self.image.get_rect()
+        #only the part of the background between the start position and the reset position is ever on the screen.
+        #These positions are measured from the centre of the background
+        self.firstX = -ROAD_START_X
+        self.image = roadImage()
+        self.rect = pygame.Rect((0, 0), imageCache.sizes["background.png"])
         self.dx = 5#scroll at speed/frame
         self.reset()
         
@@ -275,17 +2133,27 @@ class Road(pygame.sprite.Sprite):
     """
     def update(self):
         self.rect.centerx -= SCROLL_SPEED
-        if self.rect.centerx <= -3420:
+        if self.rect.centerx <= ROAD_RESET_X:
             self.reset() 
     
     """
     Reset the image position
     """
     def reset(self):
-        self.rect.centerx = 4000
+        self.rect.centerx = ROAD_START_X
+    
+    """
+    Draw the road onto the whole of the given surface, at its current position or at the given rect
+    """
+    def draw(self, surface, rect = None):
+        if rect is None:
+            rect = self.rect
+        surface.blit(self.image, (rect.centerx + self.firstX, rect.y))
 
 """
-The scoreboard class defines the text sprite at the top of the game, displaying game information such as score and health
+The scoreboard class defines the text sprite at the top of the game, displaying game information such as score and health.
+The text is made of separate pieces (labels, health, score and status) that are only redrawn when their value changes.
+Numbers are drawn by blitting pre-rendered digits, so the score going up each frame never needs a new font render.
 """
 class Scoreboard(pygame.sprite.Sprite):
     """
@@ -300,120 +2168,203 @@ class Scoreboard(pygame.sprite.Sprite):
         self.messageElapsed = 0#time status has been on screen
         self.messageLength = FRAMES_PER_SECOND * 1#Current length of the status
         
+        #render each digit (and a minus sign for negative health) and the labels once. The font is italic, so
+        #digits are spaced by the font's advance rather than by their image width, which includes the lean
+        self.colour = (0, 0, 255)
+        self.digits = {}
+        self.digitAdvance = {}
+        for char in "0123456789-":
+            self.digits[char] = self.font.render(char, 1, self.colour)
+            self.digitAdvance[char] = self.font.metrics(char)[0][4]
+        self.healthLabel = self.font.render("Health: ", 1, self.colour)
+        self.healthLabelAdvance = self.font.size("Health: ")[0]
+        self.scoreLabel = self.font.render("   Score: ", 1, self.colour)
+        self.scoreLabelAdvance = self.font.size("   Score: ")[0]
+        self.statusImage = None#the rendered status, only rendered again when the status changes
+        
+        #the values currently drawn on the image, used to tell which pieces need redrawing
+        self.shownHealth = None
+        self.shownScore = None
+        self.shownStatus = None
+        self.scoreX = 0#x position where the score digits start
+        
+        self.image = pygame.Surface((screen.get_width(), self.font.get_linesize()), pygame.SRCALPHA)
+        self.rect = self.image.get_rect()
+        self.image.blit(self.healthLabel, (0, 0))
+        
     """
     Called once per frame, the update method updates the score, health and status of the player
     """
     def update(self):
         #if the message time elapsed is less than the maximum length, add to time elapsed. Otherwise, reset the time elapsed and remove the status
-        if(self.messageElapsed <= self.messageLength and self.status is not ""):
+        if(self.messageElapsed <= self.messageLength and self.status != ""):
             self.messageElapsed += 1
         else:
             self.messageElapsed = 0
             self.status = ""
     
-        #show the current status on the screen
-        self.text = "Health: %d   Score: %d    %s" % (self.health, self.score, self.status)
-        self.image = self.font.render(self.text, 1, (0, 0, 255))
-        self.rect = self.image.get_rect()
-
-"""
-This is the game method, where all of the in-game is managed. Objects are created and updates are made to
-the screen. This is the primary method of gameplay as it makes all of the necessary calls during the game.
-"""   
-def game():
-    pygame.display.set_caption("Coin Collector!")
+        #show the current status on the screen. Health is redrawn along with everything after it (a longer number
+        #moves the rest along); a new score or status only redraws the score digits and the status.
+        #The labels end in spaces, so clearing after them never cuts into the previous piece
+        if(self.health != self.shownHealth):
+            self.clearFrom(self.healthLabelAdvance)
+            x = self.drawNumber(self.health, self.healthLabelAdvance)
+            self.drawPiece(self.scoreLabel, x)
+            self.scoreX = x + self.scoreLabelAdvance
+            self.drawScoreAndStatus()
+        elif(self.score != self.shownScore or self.status != self.shownStatus):
+            self.clearFrom(self.scoreX)
+            self.drawScoreAndStatus()
+        self.shownHealth = self.health
+        self.shownScore = self.score
     
-    #create player, environment, enemy, scoreboard, and road objects
-    player = Player()
-    enemy1 = Enemy()
-    enemy2 = Enemy()
-    coin = Environment(ENVIRONMENT_START_X, ENVIRONMENT_END_X, "coin.gif")
-    flotsam1 = Environment(ENVIRONMENT_START_X, ENVIRONMENT_END_X, "flotsam")
-    flotsam2 = Environment(ENVIRONMENT_START_X, ENVIRONMENT_END_X, "flotsam")
-    flotsam3 = Environment(ENVIRONMENT_START_X, ENVIRONMENT_END_X, "flotsam")
-    nonCollide1 = Environment(ENVIRONMENT_START_X, ENVIRONMENT_END_X, "nonCollide")
-    nonCollide2 = Environment(ENVIRONMENT_START_X, ENVIRONMENT_END_X, "nonCollide")
-    repair = Environment(REPAIR_START_X, REPAIR_END_X, "fix.gif")
-    star = Environment(STAR_START_X, STAR_END_X, "star.gif")
-    road = Road()
-    scoreboard = Scoreboard()
-
-    #setup the in-game music
-    pygame.mixer.music.load('TopGear1-2.mp3')
-    pygame.mixer.music.play(-1, 0.0)#repeat
-    pygame.mixer.music.set_volume(MUSIC_VOLUME)
+    """
+    Draw the score digits followed by the status, rendering the status only if it has changed
+    """
+    def drawScoreAndStatus(self):
+        x = self.drawNumber(self.score, self.scoreX)
+        if(self.status != self.shownStatus):
+            self.shownStatus = self.status
+            self.statusImage = None
+            if(self.status != ""):
+                self.statusImage = self.font.render("    %s" % self.status, 1, self.colour)
+        if(self.statusImage is not None):
+            self.drawPiece(self.statusImage, x)
+    
+    """
+    Draw a number at the given x position from the pre-rendered digits and return the x position after it
+    """
+    def drawNumber(self, number, x):
+        for char in str(number):
+            self.drawPiece(self.digits[char], x)
+            x += self.digitAdvance[char]
+        return x
     
-    #group each of the sprites into: friend, enemy, or score
-    friendSprites = pygame.sprite.OrderedUpdates(road, nonCollide1, nonCollide2, repair, star, coin, player)
-    enemySprites = pygame.sprite.OrderedUpdates(flotsam1, flotsam2, flotsam3, enemy1, enemy2)
-    scoreSprite = pygame.sprite.Group(scoreboard)
+    """
+    Copy a rendered piece of text onto the image. Pieces are drawn onto a cleared area, so taking the maximum
+    of each channel copies the text and its transparency exactly, and italic letters that lean into their
+    neighbour merge with it instead of darkening it
+    """
+    def drawPiece(self, piece, x):
+        self.image.blit(piece, (x, 0), None, pygame.BLEND_RGBA_MAX)
+    
+    """
+    Clear the image from the given x position to the right edge
+    """
+    def clearFrom(self, x):
+        self.image.fill((0, 0, 0, 0), pygame.Rect(x, 0, self.image.get_width() - x, self.image.get_height()))
 
-    #instantiate the clock
-    clock = pygame.time.Clock()
+"""
+The GameSession class holds one game: the player, obstacles, power-ups, road and scoreboard, and the rules of the
+game, played one tick at a time by tick(). game() plays a session in real time and draws it; other drivers, such as
+the training environments in CoinCollector_env.py, call tick() directly. The player is steered by the given
+inputSource (the mouse by default). The same seed and the same input always play out the same game; a new seed is
+chosen if none is given. Sessions share rng and spawnScheduler, so only one can be played at a time.
+"""
+class GameSession(object):
+    """
+    Constructor for GameSession
+    """
+    def __init__(self, inputSource = None, seed = None):
+        #seed the game's random choices before any objects are placed
+        if seed is None:
+            seed = newSeed()
+        rng.seed(seed)
+        gameStats.seed = seed
+        self.seed = seed
+        
+        #create player, environment, enemy, scoreboard, and road objects
+        self.player = Player(inputSource)
+        self.enemies = EnemyField(ENEMY_COUNT)
+        for i in range(ENEMY_COUNT):
+            self.enemies.spawn()
+        spawnScheduler.reset()
+        self.powerupSprites = pygame.sprite.OrderedUpdates()#the coin and power-ups on (or coming onto) the screen
+        self.coin = Environment(ENVIRONMENT_START_X, ENVIRONMENT_END_X, "coin.gif", self.powerupSprites)
+        self.flotsam = EnvironmentField(FLOTSAM_COUNT, ENVIRONMENT_START_X, ENVIRONMENT_END_X, FLOTSAM_IMAGES)
+        for i in range(FLOTSAM_COUNT):
+            self.flotsam.spawn()
+        self.nonCollide = EnvironmentField(NON_COLLIDE_COUNT, ENVIRONMENT_START_X, ENVIRONMENT_END_X, NON_COLLIDE_IMAGES)
+        for i in range(NON_COLLIDE_COUNT):
+            self.nonCollide.spawn()
+        self.repair = Environment(REPAIR_START_X, REPAIR_END_X, "fix.gif", self.powerupSprites)
+        self.star = Environment(STAR_START_X, STAR_END_X, "star.gif", self.powerupSprites)
+        self.road = Road()
+        self.scoreboard = Scoreboard()
+        
+        #group the rest of the sprites into: player or score. The obstacles are kept in their fields
+        self.playerSprite = pygame.sprite.Group(self.player)
+        self.scoreSprite = pygame.sprite.Group(self.scoreboard)
+        self.fields = [self.nonCollide, self.flotsam, self.enemies]
+        self.layers = [self.nonCollide, SpriteLayer(self.powerupSprites), SpriteLayer(self.playerSprite), self.flotsam, self.enemies, SpriteLayer(self.scoreSprite)]#in drawing order
+        
+        self.frames = 0#the number of ticks played
+        self.over = False#True once the player has no health left
     
-    #the following is the primary game loop. The in-game happens within this loop
-    keepGoing = True
-    while keepGoing:
-        clock.tick(FRAMES_PER_SECOND)#set the clock's FPS (30 by default)
-        pygame.mouse.set_visible(False)#hide the mouse
-        scoreboard.score += 1#add 1 to the score for each frame
+    """
+    Play one tick of the game: check the collisions and apply their effects, then move every sprite
+    """
+    def tick(self):
+        player = self.player
+        scoreboard = self.scoreboard
+        enemies = self.enemies
+        flotsam = self.flotsam
+        coin = self.coin
+        repair = self.repair
+        star = self.star
         
-        #if the player clicks a quit event, stop the game loop
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                keepGoing = False
+        self.frames += 1
+        scoreboard.score += 1#add 1 to the score for each tick
         
-        #check collisions
-        hitEnemy1 = pygame.sprite.collide_mask(player, enemy1)
-        hitEnemy2 = pygame.sprite.collide_mask(player, enemy2)
-        hitFlotsam1 = pygame.sprite.collide_mask(player, flotsam1)
-        hitFlotsam2 = pygame.sprite.collide_mask(player, flotsam2)
-        hitFlotsam3 = pygame.sprite.collide_mask(player, flotsam3)
-        hitRepair = pygame.sprite.collide_mask(player, repair)
-        hitStar = pygame.sprite.collide_mask(player, star)
-        enemyCollision = pygame.sprite.collide_mask(enemy1, enemy2)
+        #remember where each sprite was before this tick, for drawing frames in between ticks
+        self.road.previousRect = self.road.rect.copy()
+        for sprite in self.powerupSprites.sprites() + [player]:
+            sprite.previousRect = sprite.rect.copy()
+        for field in self.fields:
+            field.rememberPositions()
         
+        #check collisions
+        hitEnemies = collisionChecker.collideField(player, enemies)
+        hitFlotsam = collisionChecker.collideField(player, flotsam)
+        hitRepair = repair.alive() and collisionChecker.collide(player, repair)
+        hitStar = star.alive() and collisionChecker.collide(player, star)
+        overlappingEnemies = collisionChecker.collideWithin(enemies)
+    
         #if the player collects a coin, play a sound, reset the coin, add to the player's score, and update the status
-        if pygame.sprite.collide_mask(player, coin):
-            player.sndCoin.play()
+        if coin.alive() and collisionChecker.collide(player, coin):
+            audio.play("coin")
             coin.reset()
             scoreboard.score += COIN_SCORE
             scoreboard.status = "Coin! (+%d Score)" % (COIN_SCORE)
-            
+        
         #if the player collides with an enemy of flotsam, play the crash sound, take away health, make the player temporarily invulnerable
         #and reset the sprites
-        if((hitEnemy1 or hitEnemy2 or hitFlotsam1 or hitFlotsam2 or hitFlotsam3) and not player.invulnerable):
+        if((hitEnemies or hitFlotsam) and not player.invulnerable):
             player.invulnerable = True#make the player invulnerable after a hit
-            if hitEnemy1 or hitEnemy2:#if the player hit an enemy car
-                player.sndCrash.play()#play crash sound
-                scoreboard.health -= 20#take health away
-                scoreboard.status = "Hit car (-20 HP)"#update status
+            if hitEnemies:#if the player hit an enemy car
+                audio.play("crash")#play crash sound
+                scoreboard.health -= CAR_DAMAGE#take health away
+                scoreboard.status = "Hit car (-%d HP)" % (CAR_DAMAGE)#update status
                 player.hitCar += 1
-                
+            
                 #reset the enemies
-                if hitEnemy1:
-                    enemy1.reset()
-                if hitEnemy2:
-                    enemy2.reset()
-            if hitFlotsam1 or hitFlotsam2 or hitFlotsam3:#if the player hit flotsam (environmental collisions)
-                player.sndHit.play()#play hit sound
-                scoreboard.health -= 10#take health away
-                scoreboard.status = "Hit object (-10 HP)"#update status
+                for slot in hitEnemies:
+                    enemies.reset(slot)
+            if hitFlotsam:#if the player hit flotsam (environmental collisions)
+                audio.play("hit")#play hit sound
+                scoreboard.health -= FLOTSAM_DAMAGE#take health away
+                scoreboard.status = "Hit object (-%d HP)" % (FLOTSAM_DAMAGE)#update status
                 player.hitFlotsam += 1
-                
+            
                 #reset the flotsam
-                if hitFlotsam1:
-                    flotsam1.reset()
-                if hitFlotsam2:
-                    flotsam2.reset()
-                if hitFlotsam3:
-                    flotsam3.reset()
+                for slot in hitFlotsam:
+                    flotsam.reset(slot)
             if scoreboard.health <= 0: #if the player has no health left
-                keepGoing = False #end the game
-            
+                self.over = True #end the game
         
+    
         if hitRepair: #if the player hit a repair power-up
-            player.sndFix.play()
+            audio.play("fix")
             repair.reset()
             #add to the player health, up to a maximum of 100
             scoreboard.status = "Repair! (+%d HP)" % (REPAIR_HEALTH)
@@ -422,37 +2373,122 @@ def game():
                 scoreboard.health += REPAIR_HEALTH
                 if(scoreboard.health > 100):
                     scoreboard.health = 100
-                    
+                
         if hitStar: #if the player hit a star power-up
-            player.sndInvulnerable.play()
+            audio.play("invulnerable")
             star.reset()#reset the star sprite
             player.hitPowerup += 1
             player.invulnerable = True#make the player invulnerable
             player.invulnerableDuration = STAR_DURATION #make player invulnerable for given seconds
             scoreboard.status = "Star! (%d sec) " % ((STAR_DURATION - player.invulnerableElapsed)/FRAMES_PER_SECOND)
-                
-        if enemyCollision: #if the two enemy cars collide, reset one to avoid overlap
-            enemy2.reset()
             
+        #if enemy cars collide, reset the later one of each pair to avoid overlap
+        for slot in overlappingEnemies:
+            enemies.reset(slot)
+        frameProfiler.mark("collision")
+        
         #update each sprite
-        friendSprites.update()
-        enemySprites.update()
-        scoreSprite.update()
+        self.road.update()
+        self.nonCollide.update()
+        spawnScheduler.update()
+        self.powerupSprites.update()
+        self.playerSprite.update()
+        flotsam.update()
+        enemies.update()
+        self.scoreSprite.update()
+        frameProfiler.mark("update")
+    
+    """
+    Record the results of the game in gameStats
+    """
+    def record(self):
+        gameStats.record(self.frames, self.scoreboard.score, self.scoreboard.health, self.player.hitCar, self.player.hitFlotsam, self.player.hitPowerup)
+
+"""
+This is the game method, where all of the in-game is managed. A GameSession is created and played, and its frames
+are drawn to the screen. This is the primary method of gameplay as it makes all of the necessary calls during the game.
+The player is steered by the given inputSource (the mouse by default). If maxFrames is given the game ends after
+that many frames even if the player still has health left. When headless, frames run as fast as possible.
+The same seed and the same input always play out the same game; a new seed is chosen if none is given.
+"""   
+def game(inputSource = None, maxFrames = None, seed = None):
+    pygame.display.set_caption("Coin Collector!")
+    session = GameSession(inputSource, seed)
+
+    #setup the in-game music
+    audio.playMusic('TopGear1-2.mp3')
+    
+    if PROFILE_OVERLAY:
+        session.scoreSprite.add(ProfilerOverlay(frameProfiler))
+
+    #instantiate the clock and start counting collision checks, image requests and timing frames from zero
+    clock = pygame.time.Clock()
+    collisionChecker.resetCounters()
+    imageCache.resetCounters()
+    frameProfiler.reset()
+    frameProfiler.tracing = TRACE_FILE is not None
+    
+    #choose how the frames will be drawn
+    renderer = chosenRenderer()
+    renderer.start(session.road)
+    
+    #the following is the primary game loop. The in-game happens within this loop. The game itself moves on in fixed
+    #steps (ticks) of 1/FRAMES_PER_SECOND of a second, however fast frames are drawn: each frame runs however many
+    #ticks are due, and sprites are drawn part of the way between their last two positions. When headless, each frame
+    #runs exactly one tick, as fast as possible
+    keepGoing = True
+    tickLength = 1000.0 / FRAMES_PER_SECOND#in milliseconds
+    lag = 0.0#game time due to be played, in milliseconds
+    while keepGoing:
+        frameProfiler.startFrame()
+        if HEADLESS:
+            clock.tick()#no frame rate limit; just keep the clock's count of the time each frame takes
+            ticks = 1
+        else:
+            lag += clock.tick(RENDER_FRAMES_PER_SECOND)#limit the frames drawn per second (0 means no limit)
+            ticks = int(lag // tickLength)
+            lag -= ticks * tickLength
+            #if the game has fallen too far behind, let it slow down rather than never catching up
+            if(ticks > MAX_TICKS_PER_FRAME):
+                ticks = MAX_TICKS_PER_FRAME
+        frameProfiler.mark("wait")
+        pygame.mouse.set_visible(False)#hide the mouse
+        
+        #if the player clicks a quit event, stop the game loop
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                keepGoing = False
+        frameProfiler.mark("events")
         
-        #draw the sprites on the screen
-        friendSprites.draw(screen)
-        enemySprites.draw(screen)
-        scoreSprite.draw(screen)
+        for tick in range(ticks):
+            #once the game is over, do not play any more of the ticks that were due
+            if(tick > 0 and not keepGoing):
+                break
+            if maxFrames is not None and session.frames + 1 >= maxFrames:
+                keepGoing = False
+            session.tick()
+            if session.over:
+                keepGoing = False #end the game
         
-        #flip the display
-        pygame.display.flip()
+        #draw the sprites on the screen, part of the way through to the next tick, and show them on the display
+        if HEADLESS:
+            alpha = 1.0
+        else:
+            alpha = lag / tickLength
+        renderer.draw(session.layers, alpha)
+        frameProfiler.mark("draw")
+        frameProfiler.endFrame()
+    
+    session.record()
+    if TRACE_FILE is not None:
+        frameProfiler.saveTrace(TRACE_FILE)
     
     #stop the engine sound if the game is over
-    player.sndEngine.stop()
-    pygame.mixer.stop()
+    audio.stop("engine")
+    audio.stopAll()
     #return mouse cursor
     pygame.mouse.set_visible(True) 
-    return scoreboard.score
+    return session.scoreboard.score
 
 """
 The instructions method defines the intro screen for the game. This is the first screen the player sees,
@@ -462,12 +2498,10 @@ def instructions(score):
     pygame.display.set_caption("Coin Collector!")
     
     #setup the game's menu music
-    pygame.mixer.music.load('TopGear1-1.mp3')
-    pygame.mixer.music.play(-1, 0.0)#repeat 
-    pygame.mixer.music.set_volume(MUSIC_VOLUME)
+    audio.playMusic('TopGear1-1.mp3')
 
     player = Player()#create the player object
-    player.sndEngine.set_volume(0.3)
+    audio.setVolume("engine", 0.3)
     
     road = Road()#create the road object
     
@@ -477,7 +2511,7 @@ def instructions(score):
     transSurface.set_alpha(150, 0)
     
     #group the sprites
-    allSprites = pygame.sprite.OrderedUpdates(road, player)
+    allSprites = pygame.sprite.OrderedUpdates(player)
     
     insFont = pygame.font.SysFont(None, 35)#set font
 
@@ -504,7 +2538,12 @@ def instructions(score):
     for line in instructions:
         tempLabel = insFont.render(line, 1, (255, 255, 255))
         insLabels.append(tempLabel)
- 
+
+    #the leaderboard, drawn again whenever the client fetches new scores; shown in turn with the instructions
+    boardLabels = []
+    boardVersion = -1
+    boardStatus = None
+
     #define the intro keepGoing loop
     keepGoing = True
     clock = pygame.time.Clock()
@@ -527,19 +2566,46 @@ def instructions(score):
                     donePlaying = True
     
         #update and draw the sprites on the instructions screen
+        road.update()
         allSprites.update()
+        road.draw(screen)
         allSprites.draw(screen)
         screen.blit(transSurface, (0, 0))
     
-        for i in range(len(insLabels)):
-            screen.blit(insLabels[i], (50, 30*i))
+        labels = insLabels
+        if leaderboard.thread is not None:
+            status = (leaderboard.online, leaderboard.waiting)
+            if leaderboard.version != boardVersion or status != boardStatus:
+                boardLabels = leaderboardLabels(insFont)
+                boardVersion = leaderboard.version
+                boardStatus = status
+            if leaderboard.scores and (pygame.time.get_ticks() // 1000 // LEADERBOARD_SHOW_SECONDS) % 2 == 1:
+                labels = boardLabels
+        for i in range(len(labels)):
+            screen.blit(labels[i], (50, 30*i))
 
         pygame.display.flip()#flip the display
         
-    player.sndEngine.stop()    
+    audio.stop("engine")
     pygame.mouse.set_visible(True)
     return donePlaying
 
+"""
+Return the labels of the leaderboard screen: the best scores from every kiosk, as last fetched by the leaderboard
+client, and whether this kiosk's games have reached the server
+"""
+def leaderboardLabels(font):
+    lines = ["Top scores", ""]
+    for rank, result in enumerate(leaderboard.scores):
+        lines.append("%2d.  %8d   %s" % (rank + 1, result["score"], result["kiosk"]))
+    lines.append("")
+    if not leaderboard.online:
+        lines.append("Leaderboard offline: %d games waiting to be sent" % leaderboard.waiting)
+    elif leaderboard.waiting:
+        lines.append("Sending %d games..." % leaderboard.waiting)
+    lines.append("Click to start or press Escape to quit.")
+    return [font.render(line, 1, (255, 255, 255)) for line in lines]
+
 """
 The gameEnd method manages the game end screen, displaying the player's score and a relevant background.
 """
@@ -547,7 +2613,7 @@ def gameEnd(score):
     #display the background for the game end screen
     background = pygame.Surface(screen.get_size())
     background.fill((0, 0, 40))
-    background = pygame.image.load("endGame.png")
+    background = imageCache.get("endGame.png")#only loaded the first time the screen is shown
     screen.blit(background, (0, 0))
     
     #create a translucent surface on the title screen
@@ -572,7 +2638,7 @@ def gameEnd(score):
     tip9 = "Don't drink and drive."
     tip10 = "This game is like Tetris. You never REALLY beat it."
     tips = [tip1, tip2, tip3, tip4, tip5, tip6, tip7, tip8, tip9, tip10]
-    tip = random.randrange(0, len(tips))
+    tip = rng.randrange(0, len(tips))
     
     insBigFont = pygame.font.SysFont(None, 36)
     insSmallFont = pygame.font.SysFont(None, 26)
@@ -607,18 +2673,200 @@ def gameEnd(score):
     pygame.mouse.set_visible(True)
     return donePlaying
     
+"""
+Draw the loading screen: a bar showing the given number of assets loaded out of the total
+"""
+def drawLoadingScreen(font, loaded, total):
+    screen.fill((0, 0, 20))
+    screen.blit(font.render("Loading...", 1, (255, 255, 255)), (50, 200))
+    pygame.draw.rect(screen, (255, 255, 255), (50, 240, 540, 20), 1)
+    pygame.draw.rect(screen, (255, 255, 255), (52, 242, 536 * loaded // max(total, 1), 16))
+    pygame.display.flip()
+    pygame.event.pump()#keep the window responsive while loading
+
+"""
+Load every image and sound the game needs before its first screen, returning the time taken in seconds. The files
+are decoded one at a time, or on a pool of the given number of threads (by default ASSET_LOADER_THREADS), while the
+main thread shows a loading screen and finishes each asset as it arrives: images are converted to the screen's format
+(or copied from the surface cache, already converted) and get their collision masks, and the background is cropped
+for the road. The loading screen is redrawn at most every LOADING_SCREEN_INTERVAL seconds. Assets only needed later,
+such as endGame.png, are left to be loaded the first time they are used. Assets that are already loaded are skipped.
+"""
+def loadAssets(threads = None):
+    if threads is None:
+        threads = ASSET_LOADER_THREADS
+    start = time.perf_counter()
+    if USE_ASSET_ARCHIVE and assetArchive.mapping is None and os.path.exists(ASSET_ARCHIVE):
+        assetArchive.mount(ASSET_ARCHIVE)
+    audio.setUp()
+    
+    #each job is the function that decodes the file (safe to run on any thread), the file, and the function that
+    #finishes the asset on the main thread, which is given the key and the decoded file
+    jobs = []
+    for fileName in SPRITE_IMAGES:
+        if fileName not in imageCache.images:
+            jobs.append((decodeImage, fileName, imageCache.addDecoded, fileName))
+    if "background.png" not in imageCache.sizes:
+        jobs.append((lambda fileName: decodeImage(fileName, cropVariant(*roadArea())), "background.png", lambda key, decoded: roadImage(decoded), None))
+    for name, fileName in SOUND_FILES.items():
+        if name not in audio.sounds:
+            jobs.append((loadSound, fileName, audio.add, name))
+    
+    font = None
+    if not HEADLESS:
+        font = pygame.font.SysFont(None, 35)
+        drawLoadingScreen(font, 0, len(jobs))
+    lastDrawn = time.perf_counter()
+    
+    if threads > 0:
+        pool = concurrent.futures.ThreadPoolExecutor(threads)
+        try:
+            futures = dict([(pool.submit(decode, fileName), (finish, key)) for decode, fileName, finish, key in jobs])
+            finished = ((futures[future], future.result()) for future in concurrent.futures.as_completed(futures))
+            for loaded, ((finish, key), decoded) in enumerate(finished):
+                finish(key, decoded)
+                if font is not None and time.perf_counter() - lastDrawn >= LOADING_SCREEN_INTERVAL:
+                    drawLoadingScreen(font, loaded + 1, len(jobs))
+                    lastDrawn = time.perf_counter()
+        finally:
+            pool.shutdown()
+    else:
+        for loaded, (decode, fileName, finish, key) in enumerate(jobs):
+            finish(key, decode(fileName))
+            if font is not None and time.perf_counter() - lastDrawn >= LOADING_SCREEN_INTERVAL:
+                drawLoadingScreen(font, loaded + 1, len(jobs))
+                lastDrawn = time.perf_counter()
+    return time.perf_counter() - start
+
 """
 The main loop starts the gaming process by calling the instructions method, followed by the game method if the 
 player is not done playing.
 """
-def main():
+def main(recordFile = None):
+    loadAssets()#load every sprite image and sound once, before any screen is shown
+    if RECORD_SCORES:
+        scoreStore.open(SCORE_DATABASE)
+        if LEADERBOARD_SERVER is not None:
+            leaderboard.start(LEADERBOARD_SERVER, KIOSK_NAME, SCORE_DATABASE)
+            scoreStore.afterCommit = leaderboard.wake#send each result as soon as it is in the database
+    if FIRST_FRAME_ONLY:
+        pygame.event.post(pygame.event.Event(pygame.QUIT))#close the instructions screen as soon as it is drawn
     donePlaying = False
     score = 0#instantiate score
-    while not donePlaying:
-        donePlaying = instructions(score)#get the score when the player is done playing
-        if not donePlaying:
-            score = game()#get the score from the player's game
-            donePlaying = gameEnd(score)
+    try:
+        while not donePlaying:
+            donePlaying = instructions(score)#get the score when the player is done playing
+            if not donePlaying:
+                start = time.time()
+                if recordFile is None:
+                    score = game()#get the score from the player's game
+                else:
+                    #record the mouse so the game can be replayed; each new game replaces the last recording
+                    recorder = InputRecorder(mouseInput)
+                    seed = newSeed()
+                    score = game(recorder, None, seed)
+                    recorder.save(recordFile, seed)
+                scoreStore.record(time.time() - start)
+                donePlaying = gameEnd(score)
+    finally:
+        scoreStore.close()#write the results still waiting
+        leaderboard.stop()#anything not yet sent stays in the database, and is sent next time
+
+"""
+Print the best games recorded in the score database
+"""
+def printHighScores(count = HIGH_SCORE_COUNT):
+    if not os.path.exists(SCORE_DATABASE):
+        print("No games have been recorded yet")
+        return
+    scoreStore.open(SCORE_DATABASE)
+    try:
+        print("%4s  %8s  %8s  %5s  %7s  %8s  %s" % ("rank", "score", "seconds", "cars", "objects", "powerups", "played"))
+        for rank, result in enumerate(scoreStore.topScores(count)):
+            played = time.strftime("%Y-%m-%d %H:%M", time.localtime(result["played"]))
+            print("%4d  %8d  %8.1f  %5d  %7d  %8d  %s" % (rank + 1, result["score"], result["seconds"], result["hitCar"], result["hitFlotsam"], result["hitPowerup"], played))
+    finally:
+        scoreStore.close()
+
+"""
+Play a game again from a recording made with --record, frame for frame, and report the result. The replay is shown
+on the screen, or run as fast as possible when headless.
+"""
+def replayGame(fileName):
+    loadAssets()
+    global VECTORIZED
+    seed, yPositions, VECTORIZED = loadRecording(fileName)
+    start = pygame.time.get_ticks()
+    score = game(ScriptedInput(yPositions), len(yPositions), seed)
+    seconds = max(pygame.time.get_ticks() - start, 1) / 1000.0
+    print("Replay of %s: %d frames in %.2f seconds, score %d" % (fileName, gameStats.frames, seconds, score))
+    return score
+
+"""
+Return the value following the given command line option, or None if the option was not given
+"""
+def optionValue(option):
+    if option in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(option) + 1]
+    return None
+
+"""
+Play one game with no window, sound or mouse, steering through the lanes with scripted input, and report
+how fast the frames ran. This is what runs when the game is started with --headless. If a recordFile is given
+the game is saved to it so it can be replayed.
+"""
+def headlessGame(frames = HEADLESS_FRAMES, recordFile = None):
+    loadAssets()
+    inputSource = laneChangeInput()
+    if recordFile is not None:
+        inputSource = InputRecorder(inputSource)
+    start = pygame.time.get_ticks()
+    score = game(inputSource, frames)
+    if recordFile is not None:
+        inputSource.save(recordFile, gameStats.seed)
+    seconds = max(pygame.time.get_ticks() - start, 1) / 1000.0
+    print("Headless game: %d frames in %.2f seconds (%.0f frames per second), score %d" % (gameStats.frames, seconds, gameStats.frames / seconds, score))
+    screenPixels = screen.get_width() * screen.get_height()
+    pixels = chosenRenderer().averagePixelsPushed()
+    print("Pixels sent to the display per frame: %.0f (%.1f%% of the screen)" % (pixels, pixels * 100.0 / screenPixels))
+    print("Image cache during the game: %d hits, %d misses" % (imageCache.hits, imageCache.misses))
+    if imageCache.misses:
+        print("Warning: %d images were read from the disk during the game" % imageCache.misses)
+    if PROFILE_OVERLAY:
+        print("\n".join(frameProfiler.summary()))
+    return score
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--profile" in sys.argv:
+        PROFILE_OVERLAY = True
+    TRACE_FILE = optionValue("--trace")
+    if optionValue("--loader-threads") is not None:
+        ASSET_LOADER_THREADS = int(optionValue("--loader-threads"))
+    FIRST_FRAME_ONLY = "--first-frame" in sys.argv
+    if "--no-surface-cache" in sys.argv:
+        USE_SURFACE_CACHE = False
+    if "--loose-files" in sys.argv:
+        USE_ASSET_ARCHIVE = False
+    if "--no-numpy" in sys.argv:
+        VECTORIZED = False
+    if "--rush-hour" in sys.argv:
+        ENEMY_COUNT = RUSH_HOUR_ENEMIES
+        FLOTSAM_COUNT = RUSH_HOUR_FLOTSAM
+        ENEMY_SPAWN_SPREAD = RUSH_HOUR_SPREAD
+    if optionValue("--fps") is not None:
+        RENDER_FRAMES_PER_SECOND = int(optionValue("--fps"))
+    if "--no-scores" in sys.argv:
+        RECORD_SCORES = False
+    LEADERBOARD_SERVER = optionValue("--leaderboard")
+    if optionValue("--kiosk") is not None:
+        KIOSK_NAME = optionValue("--kiosk")
+    if "--high-scores" in sys.argv:
+        printHighScores()
+    elif optionValue("--replay") is not None:
+        replayGame(optionValue("--replay"))
+    elif HEADLESS:
+        headlessGame(HEADLESS_FRAMES, optionValue("--record"))
+    else:
+        main(optionValue("--record"))
+        if FIRST_FRAME_ONLY:
+            print("First frame after %.3f seconds" % (time.perf_counter() - STARTUP_START))
\ No newline at end of file